@@ -0,0 +1,115 @@
+"""
+Pool of pre-built CrewAI agents shared across runs.
+
+Building an Agent (and the LLM client behind it) costs more than running a
+short task, yet most runs use the same few personas with the same
+credentials. Agents are therefore kept after a run and handed to the next run
+that needs an identical one: the pool key is a hash of the persona's agent
+definition plus a fingerprint of the run's LLM settings, so a changed persona
+or different credentials never get a stale agent.
+
+An agent is checked out by exactly one run (and one node) at a time and
+returned with release() when the run ends. Agents of a persona are dropped
+with invalidate() when the persona is updated or deleted.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+AGENT_POOL_SIZE = int(os.environ.get("AGENT_POOL_SIZE", "64"))
+
+
+def persona_fingerprint(persona):
+    """Hash the parts of a persona that an Agent is built from"""
+    encoded = json.dumps(persona['agent'], sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def settings_fingerprint(llm_settings):
+    """Hash the credentials and model parameters of a run (never stored in clear)"""
+    if llm_settings is None:
+        return None
+    encoded = json.dumps([
+        llm_settings.api_key,
+        llm_settings.model,
+        llm_settings.base_url,
+        llm_settings.temperature,
+        llm_settings.stream,
+        llm_settings.provider
+    ]).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class AgentPool:
+    """Bounded LRU of idle agents keyed by persona content and LLM settings"""
+
+    def __init__(self, max_idle=AGENT_POOL_SIZE):
+        self.max_idle = max_idle
+        self._idle = OrderedDict()
+        self._idle_count = 0
+        # id(agent) -> (pool key, persona name) of agents currently checked out
+        self._leased = {}
+        self._lock = threading.Lock()
+
+    def checkout(self, persona, llm_settings, create):
+        """
+        Take an idle agent for `persona`, or build one with `create()`.
+
+        The agent belongs to the caller until it is passed to release().
+        """
+        key = (persona_fingerprint(persona), settings_fingerprint(llm_settings))
+        agent = None
+        with self._lock:
+            agents = self._idle.get(key)
+            if agents:
+                agent, _ = agents.pop()
+                self._idle_count -= 1
+                if not agents:
+                    del self._idle[key]
+
+        if agent is None:
+            agent = create()
+        with self._lock:
+            self._leased[id(agent)] = (key, persona.get('name'))
+        return agent
+
+    def release(self, agents):
+        """Return checked-out agents to the pool"""
+        with self._lock:
+            for agent in agents:
+                lease = self._leased.pop(id(agent), None)
+                if lease is None:
+                    # Invalidated while checked out, or not from this pool
+                    continue
+                key, name = lease
+                self._idle.setdefault(key, []).append((agent, name))
+                self._idle.move_to_end(key)
+                self._idle_count += 1
+            while self._idle_count > self.max_idle:
+                key, entries = next(iter(self._idle.items()))
+                entries.pop(0)
+                self._idle_count -= 1
+                if not entries:
+                    del self._idle[key]
+
+    def invalidate(self, persona_name):
+        """Drop every agent built from the persona called `persona_name`"""
+        with self._lock:
+            for key in list(self._idle):
+                agents = [entry for entry in self._idle[key] if entry[1] != persona_name]
+                self._idle_count -= len(self._idle[key]) - len(agents)
+                if agents:
+                    self._idle[key] = agents
+                else:
+                    del self._idle[key]
+            for agent_id, (key, name) in list(self._leased.items()):
+                if name == persona_name:
+                    del self._leased[agent_id]
+
+    def stats(self):
+        """Return counts of idle and checked-out agents"""
+        with self._lock:
+            return {"idle": self._idle_count, "leased": len(self._leased)}
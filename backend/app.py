@@ -1,25 +1,37 @@
 import os
 import logging
 import json
-from flask import Flask, request, jsonify
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, request, jsonify, stream_with_context, g
 from flask_cors import CORS
 from dotenv import load_dotenv
-from crewai import Agent, Task, Crew, Process
+from crewai import Agent, Task
+from crewai.tasks.task_output import TaskOutput
 import datetime
+import dataclasses
+import time
+from graph_scheduler import run_dag, run_dag_async, topological_levels, resolve_max_parallelism
+from storage import open_record_store, RecordExistsError
+from llm_provider import (LLMSettings, forward_llm_chunks, observe_llm_calls, flush_llm_events, agent_token_usage,
+                          LLM_PROVIDER)
+from contextlib import contextmanager, nullcontext
+from runs import RunManager, QueueFullError
+from llm_cache import ResponseCache, node_cache_key
+from graph_plan import PlanCache, compile_graph
+from agent_pool import AgentPool
+from key_validation import KeyValidationCache
+from batch import run_batch, resolve_batch_concurrency
+from log_setup import configure_logging, truncate_payload, detail_level, AGENT_VERBOSE
+import metrics
+from timings import RunTimings, chrome_trace
+from context_policy import apply_context_policy, count_tokens, summary_cache_key, truncate_to_tokens, SUMMARY_PROMPT
 
 # Load environment variables
 load_dotenv()
 
-# Setup logging
-log_file = "backend/crew_run.log"
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(log_file, mode='w'),
-        logging.StreamHandler()
-    ]
-)
+# Setup logging (written by a background thread, see log_setup.py)
+configure_logging()
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -28,76 +40,101 @@ CORS(app)  # Enable CORS for all routes
 PERSONAS_FILE = "personas.json"
 SYSTEMS_FILE = "systems.json"
 
-def log_section(title: str):
-    logging.info("\n" + "#" * 60)
-    logging.info(f"# {title}")
-    logging.info("#" * 60 + "\n")
+# Background workers for runs submitted through /api/runs
+run_manager = RunManager()
+
+# Node output cache, used by runs that opt in with "use_cache"
+response_cache = ResponseCache()
+
+# Summaries passed along "summary" context edges, shared by all runs
+summary_cache = ResponseCache()
+
+# Compiled execution plans of saved systems
+plan_cache = PlanCache()
+
+# Agents kept between runs for identical personas and credentials
+agent_pool = AgentPool()
+
+# Recent outcomes of /api/validate-api-key, keyed by a salted hash of the key
+key_validation_cache = KeyValidationCache()
+
+# Threads for the LLM calls of async runs when CrewAI has no async task API
+async_task_threads = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("ASYNC_TASK_THREADS", "64")),
+    thread_name_prefix="crew-async-task"
+)
+
+# Scraped from /metrics along with the latencies recorded by requests and runs
+metrics.registry.gauge("crew_runs_queued", "Runs waiting for a worker",
+                       function=lambda: run_manager.stats()["queued"])
+metrics.registry.gauge("crew_runs_in_flight", "Runs being executed",
+                       function=lambda: run_manager.stats()["running"])
+metrics.registry.gauge("crew_agent_pool_idle", "Idle agents kept in the agent pool",
+                       function=lambda: agent_pool.stats()["idle"])
+
+# Storage backend is selected with STORAGE_BACKEND (json by default, or sqlite)
+persona_store = open_record_store('personas', PERSONAS_FILE)
+system_store = open_record_store('systems', SYSTEMS_FILE)
+
+def log_section(title: str, level=logging.INFO):
+    logging.log(level, "\n" + "#" * 60)
+    logging.log(level, f"# {title}")
+    logging.log(level, "#" * 60 + "\n")
 
 def load_personas():
-    """Load personas from JSON file"""
-    if not os.path.exists(PERSONAS_FILE):
-        return []
-    
-    with open(PERSONAS_FILE, 'r') as f:
-        return json.load(f)
+    """Load personas from the configured storage backend"""
+    return persona_store.all()
 
 def save_personas(personas):
-    """Save personas to JSON file"""
-    with open(PERSONAS_FILE, 'w') as f:
-        json.dump(personas, f, indent=4)
+    """Replace all personas in the configured storage backend"""
+    persona_store.save_all(personas)
 
 def load_systems():
-    """Load saved systems from JSON file"""
-    if not os.path.exists(SYSTEMS_FILE):
-        return []
-    
-    with open(SYSTEMS_FILE, 'r') as f:
-        return json.load(f)
+    """Load saved systems from the configured storage backend"""
+    return system_store.all()
 
 def save_systems(systems):
-    """Save systems to JSON file"""
-    with open(SYSTEMS_FILE, 'w') as f:
-        json.dump(systems, f, indent=4)
+    """Replace all systems in the configured storage backend"""
+    system_store.save_all(systems)
 
 def find_system_by_name(name):
     """Find a system by name"""
-    systems = load_systems()
-    for system in systems:
-        if system['name'] == name:
-            return system
-    return None
+    return system_store.get(name)
 
 def find_persona_by_name(name):
     """Find a persona by name"""
-    personas = load_personas()
-    for persona in personas:
-        if persona['name'] == name:
-            return persona
-    return None
-
-def create_agent_from_persona(persona):
-    """Create a CrewAI Agent from a persona definition"""
+    return persona_store.get(name)
+
+def create_agent_from_persona(persona, llm=None, verbose=False):
+    """Create a CrewAI Agent from a persona definition, bound to the run's LLM"""
+    if llm is None and LLM_PROVIDER == 'mock':
+        # Without credentials CrewAI would build its default (networked) LLM
+        from mock_llm import create_mock_llm
+        llm = create_mock_llm()
     agent_data = persona['agent']
     return Agent(
         role=agent_data['role'],
         goal=agent_data['goal'],
         backstory=agent_data['backstory'],
-        verbose=True,
+        llm=llm,
+        verbose=verbose,
         allow_delegation=False
     )
 
-def create_prompt_task(user_prompt):
+# Definition of the agent behind the special prompt node
+PROMPT_PERSONA = {
+    'name': 'Prompt',
+    'agent': {
+        'role': "Prompt Provider",
+        'goal': "Provide the user's original prompt as context",
+        'backstory': "You are a simple agent that provides the user's original input."
+    }
+}
+
+def create_prompt_task(user_prompt, llm=None, agent=None):
     """Create a special task that represents the user's prompt"""
-    from crewai import Agent, Task
-    
     # Create a simple agent for the prompt task
-    prompt_agent = Agent(
-        role="Prompt Provider",
-        goal="Provide the user's original prompt as context",
-        backstory="You are a simple agent that provides the user's original input.",
-        verbose=True,
-        allow_delegation=False
-    )
+    prompt_agent = agent or create_agent_from_persona(PROMPT_PERSONA, llm=llm)
     
     # Create a task that just returns the user prompt
     prompt_task = Task(
@@ -111,185 +148,175 @@ def create_prompt_task(user_prompt):
     
     return prompt_task
 
-def create_task_from_persona(persona, context_tasks=None, user_prompt=None, prompt_context=None):
-    """Create a CrewAI Task from a persona definition"""
-    task_data = persona['task']
-    description = task_data['description']
-    
-    # Replace placeholder if user_prompt is provided
-    if user_prompt and '{user_prompt}' in description:
-        description = description.format(user_prompt=user_prompt)
-    
-    # If we have prompt context, modify the description to include it
-    if prompt_context:
-        description = f"Original user prompt: {prompt_context}\n\n{description}"
-    
+# Separator CrewAI uses when joining the outputs of context tasks
+CONTEXT_DIVIDER = "\n\n----------\n\n"
+
+def create_task_from_persona(persona, description, agent, context_tasks=None):
+    """Create a CrewAI Task from a persona definition and its rendered description"""
     return Task(
         description=description,
-        agent=create_agent_from_persona(persona),
+        agent=agent,
         context=context_tasks or [],
-        expected_output=task_data['expected_output']
+        expected_output=persona['task']['expected_output']
     )
 
-def execute_crew_graph(graph_data, user_prompt):
+def bind_graph_plan(plan, prompt_task, user_prompt, checkout_agent, log_level=logging.INFO, timings=None):
     """
-    Execute a crew based on a graph definition
+    Create the tasks of a compiled plan for one run
     
-    Args:
-        graph_data: dict with 'nodes' and 'edges' keys
-        user_prompt: string user input
+    Each node's context sources and prompt injection are already resolved by
+    the plan, so every Task is created exactly once; `checkout_agent(persona)`
+    supplies the node's agent. Rendering each node's description is recorded
+    as a "prompt_build" span when `timings` is given.
     
     Returns:
-        dict with final output and step outputs
+        (tasks, node_map, node_personas, dependencies) keyed by node id;
+        tasks and node_map include the special 'prompt' node
     """
-    try:
-        log_section("New Crew Run Started")
-        logging.info(f"User Prompt: {user_prompt}")
-        
-        nodes = graph_data.get('nodes', [])
-        edges = graph_data.get('edges', [])
-        
-        logging.info(f"Graph Nodes: {[node.get('id') for node in nodes]}")
-        logging.info(f"Graph Edges: {[(edge.get('source'), edge.get('target')) for edge in edges]}")
-        
-        if not nodes:
-            raise ValueError("No nodes provided in graph")
-        
-        # Create a mapping of node IDs to personas
-        node_map = {}
-        tasks = {}
-        
-        # Create the special Prompt task
-        prompt_task = create_prompt_task(user_prompt)
-        tasks['prompt'] = prompt_task
-        node_map['prompt'] = {'id': 'prompt', 'persona': 'Prompt', 'role': 'Prompt Provider'}
-        logging.info("Created special 'prompt' node")
-        
-        # First pass: create all agents and tasks
-        blank_nodes = []
-        for node in nodes:
-            node_id = node.get('id')
-            persona_name = node.get('persona')
-            
-            if not node_id:
-                logging.warning(f"Skipping node with missing id: {node}")
-                continue
-            
-            # Skip the special "prompt" node as it's created programmatically
-            if node_id == 'prompt':
-                logging.info(f"Skipping special 'prompt' node from graph data - using programmatically created one")
-                continue
-                
-            if not persona_name or persona_name.strip() == '':
-                blank_nodes.append(node_id)
-                logging.warning(f"Node '{node_id}' has no persona assigned")
-                continue
-                
-            persona = find_persona_by_name(persona_name)
-            if not persona:
-                logging.warning(f"Persona '{persona_name}' not found for node {node_id}")
-                continue
-            
-            try:
-                # Create task (context will be set in second pass)
-                task = create_task_from_persona(persona, user_prompt=user_prompt)
-                tasks[node_id] = task
-                node_map[node_id] = node
-                logging.info(f"Created task for node '{node_id}' with persona '{persona_name}'")
-            except Exception as e:
-                logging.error(f"Failed to create task for node '{node_id}' with persona '{persona_name}': {str(e)}")
-                continue
+    tasks = {'prompt': prompt_task}
+    node_map = {'prompt': {'id': 'prompt', 'persona': 'Prompt', 'role': 'Prompt Provider'}}
+    node_personas = {}
+    
+    # Execution order guarantees every context task exists before its dependents
+    for node_id in plan.order:
+        planned = plan.nodes[node_id]
+        with timings.span("prompt_build", track=node_id) if timings is not None else nullcontext():
+            description = planned.render_description(user_prompt)
+        tasks[node_id] = create_task_from_persona(
+            planned.persona,
+            description,
+            checkout_agent(planned.persona),
+            context_tasks=[tasks[source_id] for source_id in planned.context]
+        )
+        node_map[node_id] = planned.node
+        node_personas[node_id] = planned.persona
+        if planned.receives_prompt:
+            logging.log(log_level, f"Node '{node_id}' will receive the original prompt context")
+    
+    # Keep graph order for the step outputs and the final output
+    tasks = {'prompt': prompt_task, **{node_id: tasks[node_id] for node_id in plan.nodes}}
+    dependencies = {node_id: list(deps) for node_id, deps in plan.dependencies.items()}
+    return tasks, node_map, node_personas, dependencies
+
+class GraphRun:
+    """
+    One execution of a crew graph
+    
+    setup() binds the plan to the run's prompt and agents and announces the
+    execution levels; the nodes are then executed by run_node (on scheduler
+    threads) or run_node_async (on an event loop), and result() assembles the
+    response. close() must be called when the run ends to return its agents
+    (async runs first await join_task_threads()).
+    """
+    
+    def __init__(self, graph_data, user_prompt, llm_settings=None, max_parallelism=None, listener=None,
+                 response_cache=None, previous_nodes=None, plan=None, verbose=None, system_name=None,
+                 timings=None, report_timings=False):
+        self.graph_data = graph_data
+        self.user_prompt = user_prompt
+        self.llm_settings = llm_settings
+        self.max_parallelism = max_parallelism
+        self.emit = listener or (lambda event: None)
+        self.stream_chunks = listener is not None and llm_settings is not None and llm_settings.stream
+        self.response_cache = response_cache
+        self.previous_nodes = previous_nodes or {}
+        self.plan = plan
+        self.cached_nodes = set()
+        self.reused_nodes = set()
+        self.leased_agents = []
+        # Calls of async runs on async_task_threads, which keep running when their node is cancelled
+        self.task_thread_calls = []
+        # Metric labels and timings
+        self.system_label = system_name or "adhoc"
+        if llm_settings is None:
+            self.model_label = "default"
+        else:
+            self.model_label = "mock" if llm_settings.provider == 'mock' else llm_settings.model
+        self.started = time.perf_counter()
+        self.node_started = {}
+        self.node_finished = {}
+        # Usage of each node's LLM calls: CrewAI's per-agent totals before the call, then the call events' sums
+        self.agent_usage_before = {}
+        self.node_usage = {}
+        self.context_tokens = {}
+        self.succeeded = False
+        # Spans of this run (continuing those of the request that started it)
+        self.timings = timings or RunTimings()
+        self.report_timings = report_timings
+        # CrewAI transcripts for this run's agents; per-node log lines for verbose and sampled runs
+        self.verbose = AGENT_VERBOSE if verbose is None else bool(verbose)
+        self.log_level = detail_level(self.verbose)
+        # One LLM per run, shared by the agents it has to build and isolated from other requests
+        self.llm = None
+    
+    def get_llm(self):
+        """Return the run's LLM, creating it on first use (None for CrewAI's default LLM)"""
+        if self.llm is None and self.llm_settings is not None:
+            self.llm = self.llm_settings.create_llm()
+        return self.llm
+    
+    def checkout_agent(self, persona):
+        """Take a pooled agent for a persona, building it with the run's LLM if needed"""
+        def create():
+            return create_agent_from_persona(persona, llm=self.get_llm(), verbose=self.verbose)
+        with self.timings.span("agent_construction"):
+            agent = agent_pool.checkout(persona, self.llm_settings, create)
+        # Pooled agents may come from a run with another verbosity
+        agent.verbose = self.verbose
+        self.leased_agents.append(agent)
+        return agent
+    
+    def setup(self):
+        """Create the run's tasks and emit the "run_planned" event"""
+        level = self.log_level
+        log_section("New Crew Run Started", level)
+        logging.log(level, f"User Prompt: {truncate_payload(self.user_prompt)}")
         
-        # Check for blank nodes and provide clear error message
-        if blank_nodes:
-            blank_nodes_str = ', '.join(blank_nodes)
-            raise ValueError(f"Cannot run workflow: {len(blank_nodes)} node(s) without personas assigned ({blank_nodes_str}). Please assign personas to all nodes before running.")
+        nodes = self.graph_data.get('nodes', [])
+        edges = self.graph_data.get('edges', [])
         
-        # Validate that we have at least one task (excluding prompt)
-        if len(tasks) <= 1:  # Only prompt task exists
-            raise ValueError("No valid personas found for any nodes in the graph. Please ensure the persona names match those in personas.json")
+        logging.log(level, f"Graph Nodes: {[node.get('id') for node in nodes]}")
+        logging.log(level, f"Graph Edges: {[(edge.get('source'), edge.get('target')) for edge in edges]}")
         
-        # Second pass: set up task dependencies based on edges
-        logging.info("Setting up task dependencies...")
-        for edge in edges:
-            source_id = edge.get('source')
-            target_id = edge.get('target')
-            
-            if source_id in tasks and target_id in tasks:
-                # Add source task as context for target task
-                if tasks[target_id].context is None:
-                    tasks[target_id].context = []
-                tasks[target_id].context.append(tasks[source_id])
-                logging.info(f"Added edge: {source_id} -> {target_id}")
-            else:
-                logging.warning(f"Invalid edge: {source_id} -> {target_id} (one or both nodes not found)")
-        
-        # Third pass: handle prompt context for tasks that need it
-        # Find tasks that have edges from 'prompt' and add prompt context
-        logging.info("Processing prompt context...")
-        for edge in edges:
-            source_id = edge.get('source')
-            target_id = edge.get('target')
+        if self.plan is not None:
+            logging.log(level, "Using compiled execution plan")
+        else:
+            # Ad-hoc graphs are compiled for this run only
+            with self.timings.span("graph_validation"):
+                self.plan = compile_graph(
+                    self.graph_data, self.timings.timed(find_persona_by_name, "persona_resolution")
+                )
+        plan = self.plan
+        
+        with self.timings.span("task_construction"):
+            # Create the special Prompt task
+            prompt_task = create_prompt_task(self.user_prompt, agent=self.checkout_agent(PROMPT_PERSONA))
+            logging.log(level, "Created special 'prompt' node")
             
-            if source_id == 'prompt' and target_id in tasks:
-                logging.info(f"Adding prompt context to node '{target_id}'")
-                # This task needs the original prompt context
-                # Recreate the task with prompt context
-                persona_name = node_map[target_id].get('persona')
-                persona = find_persona_by_name(persona_name)
-                if persona:
-                    # Get existing context (excluding prompt task)
-                    existing_context = []
-                    if tasks[target_id].context:
-                        existing_context = [ctx for ctx in tasks[target_id].context if ctx != prompt_task]
-                    
-                    logging.info(f"Node '{target_id}' will receive:")
-                    logging.info(f"  - Original prompt context")
-                    if existing_context:
-                        logging.info(f"  - Context from: {[ctx.agent.role for ctx in existing_context]}")
-                    else:
-                        logging.info(f"  - No additional context from other agents")
-                    
-                    # Recreate task with prompt context
-                    new_task = create_task_from_persona(
-                        persona, 
-                        context_tasks=existing_context,
-                        user_prompt=user_prompt,
-                        prompt_context=user_prompt
-                    )
-                    tasks[target_id] = new_task
-                    logging.info(f"Recreated task for '{target_id}' with prompt context")
+            tasks, node_map, node_personas, dependencies = bind_graph_plan(
+                plan, prompt_task, self.user_prompt, self.checkout_agent, log_level=level, timings=self.timings
+            )
+        self.tasks = tasks
+        self.node_map = node_map
+        self.node_personas = node_personas
+        self.dependencies = dependencies
         
         # Log final context for each task
-        logging.info("Final task context summary:")
+        logging.log(level, "Final task context summary:")
         for node_id, task in tasks.items():
             if node_id == 'prompt':
-                logging.info(f"  {node_id}: Special prompt node (no execution needed)")
+                logging.log(level, f"  {node_id}: Special prompt node (no execution needed)")
             else:
-                context_sources = []
-                if task.context:
-                    for ctx in task.context:
-                        if ctx == prompt_task:
-                            context_sources.append("original prompt")
-                        else:
-                            context_sources.append(f"output from {ctx.agent.role}")
+                context_sources = ["original prompt"] if plan.nodes[node_id].receives_prompt else []
+                context_sources += [f"output from {ctx.agent.role}" for ctx in task.context or []]
                 
                 if context_sources:
-                    logging.info(f"  {node_id} ({task.agent.role}): Will receive context from {', '.join(context_sources)}")
+                    logging.log(level, f"  {node_id} ({task.agent.role}): Will receive context from {', '.join(context_sources)}")
                 else:
-                    logging.info(f"  {node_id} ({task.agent.role}): No context (entry point)")
-        
-        # Find tasks with no dependencies (entry points) - exclude prompt task
-        entry_tasks = []
-        for node_id, task in tasks.items():
-            if node_id != 'prompt' and (not task.context or all(ctx == prompt_task for ctx in task.context)):
-                entry_tasks.append(task)
-        
-        if not entry_tasks:
-            # If no entry points found, use all tasks except prompt
-            entry_tasks = [task for node_id, task in tasks.items() if node_id != 'prompt']
+                    logging.log(level, f"  {node_id} ({task.agent.role}): No context (entry point)")
         
-        logging.info(f"Entry points: {[task.agent.role for task in entry_tasks]}")
+        # Tasks with no dependencies (entry points) - the prompt node does not count
+        logging.log(level, f"Entry points: {[tasks[node_id].agent.role for node_id in plan.entry_points]}")
         
         # Create and run the crew (exclude prompt task from execution)
         all_agents = [task.agent for node_id, task in tasks.items() if node_id != 'prompt']
@@ -301,17 +328,273 @@ def execute_crew_graph(graph_data, user_prompt):
         if not all_tasks:
             raise ValueError("No tasks could be created from the provided personas")
         
-        logging.info("Starting crew execution...")
-        crew = Crew(
-            agents=all_agents,
-            tasks=all_tasks,
-            process=Process.sequential,
-            verbose=True
+        levels = topological_levels(dependencies)
+        self.max_parallelism = resolve_max_parallelism(self.max_parallelism)
+        logging.info(f"Execution levels: {levels}")
+        logging.info(f"Starting crew execution (max parallelism: {self.max_parallelism})...")
+        
+        self.emit({
+            "type": "run_planned",
+            "nodes": {
+                node_id: {"persona": node_map[node_id].get('persona'), "role": node_map[node_id].get('role', '')}
+                for node_id in dependencies
+            },
+            "levels": levels
+        })
+        self.execution_started = time.perf_counter()
+    
+    def begin_node(self, node_id):
+        """
+        Announce a node and work out its inputs
+        
+        Returns:
+            (context, fingerprint, output); output is the reused TaskOutput when
+            the node does not need to call the LLM, None otherwise
+        """
+        task = self.tasks[node_id]
+        logging.log(self.log_level, f"Running node '{node_id}' ({task.agent.role})")
+        started = self.node_started[node_id] = time.perf_counter()
+        # Time between the last dependency finishing and a worker picking the node up
+        ready = max((self.node_finished[dep_id] for dep_id in self.dependencies[node_id]), default=self.execution_started)
+        self.timings.add("queue_wait", ready, started, track=node_id)
+        self.emit({"type": "node_started", "node": node_id})
+        with self.timings.span("context", track=node_id):
+            context = self.build_context(node_id)
+        
+        # Identifies the node's inputs; equal fingerprints mean the LLM call can be skipped
+        fingerprint = node_cache_key(self.node_personas[node_id], task.description, context, self.llm_settings)
+        
+        reused_output = None
+        previous = self.previous_nodes.get(node_id)
+        if previous and previous.get('fingerprint') == fingerprint:
+            logging.info(f"Node '{node_id}' unchanged since the previous run, reusing its output")
+            reused_output = previous['output']
+            self.reused_nodes.add(node_id)
+        elif self.response_cache is not None:
+            reused_output = self.response_cache.get(fingerprint)
+            if reused_output is not None:
+                logging.info(f"Cache hit for node '{node_id}'")
+                self.cached_nodes.add(node_id)
+        
+        if reused_output is None:
+            self.agent_usage_before[node_id] = agent_token_usage(task.agent)
+            return context, fingerprint, None
+        
+        self.record_node(node_id, "cached" if node_id in self.cached_nodes else "reused")
+        task.output = TaskOutput(description=task.description, raw=reused_output, agent=task.agent.role)
+        self.emit({
+            "type": "node_completed",
+            "node": node_id,
+            "output": reused_output,
+            "fingerprint": fingerprint,
+            "cached": node_id in self.cached_nodes,
+            "reused": node_id in self.reused_nodes
+        })
+        return context, fingerprint, task.output
+    
+    def build_context(self, node_id):
+        """
+        Join the outputs of a node's context sources, each reduced by its edge's context policy
+        
+        The tokens of the raw outputs and of the context actually sent are
+        recorded for the node's step output and the metrics.
+        """
+        planned = self.plan.nodes[node_id]
+        parts = []
+        raw_tokens = sent_tokens = 0
+        # The task's context tasks are in the same order as the plan's context sources
+        for source_id, source_task in zip(planned.context, self.tasks[node_id].context or []):
+            if source_task.output is None:
+                continue
+            raw = source_task.output.raw
+            policy = planned.policy_for(source_id)
+            if policy.mode == "summary":
+                with self.timings.span("summary", track=node_id, source=source_id):
+                    text = apply_context_policy(raw, policy, self.summarize)
+            else:
+                text = apply_context_policy(raw, policy)
+            parts.append(text)
+            tokens = count_tokens(raw)
+            raw_tokens += tokens
+            sent_tokens += tokens if text is raw else count_tokens(text)
+        
+        self.context_tokens[node_id] = {"raw": raw_tokens, "sent": sent_tokens}
+        persona = self.node_map[node_id].get('persona') or ''
+        metrics.CONTEXT_TOKENS.inc(raw_tokens, persona=persona, kind="raw")
+        metrics.CONTEXT_TOKENS.inc(sent_tokens, persona=persona, kind="sent")
+        return CONTEXT_DIVIDER.join(parts)
+    
+    def summarize(self, text, max_tokens):
+        """Summarize an upstream output for a "summary" context edge, reusing cached summaries"""
+        key = summary_cache_key(text, max_tokens, self.llm_settings)
+        summary = summary_cache.get(key)
+        if summary is not None:
+            return summary
+        try:
+            llm = self.get_llm()
+            if llm is None:
+                raise ValueError("no LLM configured for this run")
+            metrics.LLM_REQUESTS.inc(model=self.model_label)
+            answer = llm.call([{"role": "user", "content": SUMMARY_PROMPT.format(max_tokens=max_tokens, text=text)}])
+        except Exception as e:
+            # Compressing the context must not fail the run
+            logging.warning(f"Context summary failed ({type(e).__name__}: {e}), truncating instead")
+            return truncate_to_tokens(text, max_tokens)
+        summary = truncate_to_tokens(str(answer).strip(), max_tokens)
+        summary_cache.put(key, summary)
+        return summary
+    
+    def record_node(self, node_id, outcome):
+        """Record a node's duration in the metrics and timings"""
+        finished = self.node_finished[node_id] = time.perf_counter()
+        persona = self.node_map[node_id].get('persona') or ''
+        metrics.NODE_DURATION.observe(finished - self.node_started[node_id], persona=persona, outcome=outcome)
+        self.timings.add("node", self.node_started[node_id], finished, track=node_id, persona=persona, outcome=outcome)
+    
+    def record_llm_usage(self, node_id):
+        """Count the LLM calls and tokens of a node's execution in the metrics"""
+        usage = self.node_usage.pop(node_id, None)
+        before = self.agent_usage_before.pop(node_id, None)
+        if not usage or not usage["requests"]:
+            # No LLM call events (older CrewAI, mock LLM): CrewAI's per-agent totals
+            after = agent_token_usage(self.tasks[node_id].agent)
+            if before is None or after is None:
+                return
+            usage = {key: after[key] - before[key] for key in after}
+        metrics.LLM_REQUESTS.inc(usage["requests"], model=self.model_label)
+        for kind in ("prompt", "completion"):
+            metrics.LLM_TOKENS.inc(usage[f"{kind}_tokens"], model=self.model_label, kind=kind)
+    
+    def finish_node(self, node_id, output, fingerprint):
+        """Cache a node's fresh output and announce it"""
+        self.record_node(node_id, "completed")
+        self.record_llm_usage(node_id)
+        if self.response_cache is not None:
+            self.response_cache.put(fingerprint, output.raw)
+        self.emit({"type": "node_completed", "node": node_id, "output": output.raw, "fingerprint": fingerprint})
+    
+    def fail_node(self, node_id, error):
+        """Record a node's failure and announce it"""
+        self.record_node(node_id, "failed")
+        self.record_llm_usage(node_id)
+        metrics.ERRORS.inc(stage="node", type=type(error).__name__)
+        self.emit({"type": "node_failed", "node": node_id, "error": str(error)})
+    
+    def chunk_forwarding(self, node_id, thread_fallback=True):
+        """Context forwarding the node's token deltas as "node_chunk" events, if requested"""
+        if not self.stream_chunks:
+            return nullcontext()
+        return forward_llm_chunks(
+            self.tasks[node_id].agent,
+            lambda delta: self.emit({"type": "node_chunk", "node": node_id, "delta": delta}),
+            thread_fallback=thread_fallback
         )
-        
-        final_output = crew.kickoff()
-        
-        # Extract raw output from CrewOutput object
+    
+    @contextmanager
+    def call_recording(self, node_id, thread_fallback=True):
+        """
+        Context recording each LLM call of the node as an "llm_call" span
+        (retries included) and keeping the usage of the calls for the metrics.
+        Call flush_llm_events() before leaving it.
+        """
+        calls = []
+        
+        def record(start, end, error):
+            args = {"call": len(calls) + 1}
+            if calls and calls[-1] is not None:
+                args["retry"] = True
+            if error is not None:
+                args["error"] = truncate_payload(error, 200)
+            calls.append(error)
+            self.timings.add("llm_call", start, end, track=node_id, **args)
+        
+        with observe_llm_calls(self.tasks[node_id].agent, record, thread_fallback=thread_fallback) as usage:
+            try:
+                yield
+            finally:
+                self.node_usage[node_id] = usage
+    
+    def execute_task(self, node_id, context):
+        """Call the LLM for a node, blocking the calling thread"""
+        task = self.tasks[node_id]
+        with self.timings.span("llm", track=node_id), self.chunk_forwarding(node_id), self.call_recording(node_id):
+            try:
+                return task.execute_sync(agent=task.agent, context=context)
+            finally:
+                flush_llm_events()
+    
+    def run_node(self, node_id):
+        """Execute one node on the calling thread"""
+        context, fingerprint, output = self.begin_node(node_id)
+        if output is not None:
+            return output
+        try:
+            output = self.execute_task(node_id, context)
+        except Exception as e:
+            self.fail_node(node_id, e)
+            raise
+        self.finish_node(node_id, output, fingerprint)
+        return output
+    
+    async def in_task_thread(self, function, *args):
+        """Await a blocking call made on async_task_threads"""
+        future = async_task_threads.submit(function, *args)
+        self.task_thread_calls.append(future)
+        return await asyncio.wrap_future(future)
+    
+    async def join_task_threads(self):
+        """
+        Wait for the run's calls on async_task_threads to end.
+        
+        Cancelling a node does not stop a call already running on a thread;
+        its agent must not go back to the pool while it still executes.
+        """
+        pending = [future for future in self.task_thread_calls if not future.done()]
+        if pending:
+            logging.info(f"Waiting for {len(pending)} node call(s) still running before releasing agents")
+            await asyncio.gather(*(asyncio.wrap_future(future) for future in pending), return_exceptions=True)
+    
+    async def run_node_async(self, node_id):
+        """Execute one node on the running event loop"""
+        if self.plan.nodes[node_id].needs_summary:
+            # Summarizing its context may call the LLM: keep it off the loop
+            context, fingerprint, output = await self.in_task_thread(self.begin_node, node_id)
+        else:
+            context, fingerprint, output = self.begin_node(node_id)
+        if output is not None:
+            return output
+        task = self.tasks[node_id]
+        try:
+            aexecute = getattr(task, 'aexecute_sync', None)
+            if aexecute is not None:
+                with self.timings.span("llm", track=node_id), \
+                        self.chunk_forwarding(node_id, thread_fallback=False), \
+                        self.call_recording(node_id, thread_fallback=False):
+                    try:
+                        output = await aexecute(agent=task.agent, context=context)
+                    finally:
+                        await asyncio.to_thread(flush_llm_events)
+            else:
+                # This CrewAI version has no async task API: keep the blocking call off the loop
+                output = await self.in_task_thread(self.execute_task, node_id, context)
+        except Exception as e:
+            self.fail_node(node_id, e)
+            raise
+        self.finish_node(node_id, output, fingerprint)
+        return output
+    
+    def result(self, node_outputs):
+        """Build the run's response from the outputs of all nodes"""
+        tasks = self.tasks
+        if self.response_cache is not None:
+            logging.info(f"Cache hits: {len(self.cached_nodes)}/{len(self.dependencies)} nodes")
+        if self.previous_nodes:
+            logging.info(f"Reused from previous run: {len(self.reused_nodes)}/{len(self.dependencies)} nodes")
+        
+        # The final output is the one of the last task in graph order, as with a sequential crew
+        final_output = node_outputs[list(self.dependencies)[-1]]
+        
+        # Extract raw output from TaskOutput object
         if hasattr(final_output, 'raw'):
             final_output_text = final_output.raw
         else:
@@ -319,7 +602,8 @@ def execute_crew_graph(graph_data, user_prompt):
         
         # Collect step outputs and log what each task received
         steps_output = {}
-        logging.info("Task execution results:")
+        level = self.log_level
+        logging.log(level, "Task execution results:")
         for node_id, task in tasks.items():
             output = "Task did not produce output."
             if task.output:
@@ -327,43 +611,163 @@ def execute_crew_graph(graph_data, user_prompt):
             
             steps_output[node_id] = {
                 "output": output,
-                "persona": node_map[node_id].get('persona'),
-                "role": node_map[node_id].get('role', '')
+                "persona": self.node_map[node_id].get('persona'),
+                "role": self.node_map[node_id].get('role', '')
             }
+            if self.response_cache is not None:
+                steps_output[node_id]["cached"] = node_id in self.cached_nodes
+            if self.previous_nodes:
+                steps_output[node_id]["reused"] = node_id in self.reused_nodes
+            if node_id in self.context_tokens:
+                steps_output[node_id]["context_tokens"] = self.context_tokens[node_id]
             
             if node_id == 'prompt':
-                logging.info(f"  {node_id}: {output}")
+                logging.log(level, f"  {node_id}: {truncate_payload(output)}")
             else:
                 # Log what context this task received
-                context_info = []
-                if task.context:
-                    for ctx in task.context:
-                        if ctx == prompt_task:
-                            context_info.append("original prompt")
-                        else:
-                            context_info.append(f"output from {ctx.agent.role}")
+                context_info = ["original prompt"] if self.plan.nodes[node_id].receives_prompt else []
+                context_info += [f"output from {ctx.agent.role}" for ctx in task.context or []]
                 
                 context_str = f" (received: {', '.join(context_info)})" if context_info else " (no context)"
-                logging.info(f"  {node_id} ({task.agent.role}):{context_str}")
-                logging.info(f"    Output: {output[:100]}{'...' if len(output) > 100 else ''}")
+                logging.log(level, f"  {node_id} ({task.agent.role}):{context_str}")
+                tokens = self.context_tokens.get(node_id)
+                if tokens and tokens["sent"] != tokens["raw"]:
+                    logging.log(level, f"    Context tokens: {tokens['raw']} -> {tokens['sent']}")
+                logging.log(level, f"    Output: {truncate_payload(output, 100)}")
         
-        log_section("Final Result")
-        logging.info(final_output_text)
+        log_section("Final Result", level)
+        logging.log(level, truncate_payload(final_output_text))
+        self.succeeded = True
         
-        return {
+        result = {
             "final": final_output_text,
             "steps": steps_output
         }
+        if self.report_timings:
+            result["timings"] = self.timings.summary()
+        return result
+    
+    def close(self):
+        """Return the run's agents to the pool, record the run's duration and report its spans"""
+        agent_pool.release(self.leased_agents)
+        self.leased_agents = []
+        # Kept by the run manager for /api/runs/<run_id>/trace, also for failed runs
+        self.emit({"type": "run_trace", "spans": [span.to_dict() for span in self.timings.spans()]})
+        metrics.RUN_DURATION.observe(
+            time.perf_counter() - self.started,
+            system=self.system_label,
+            status="succeeded" if self.succeeded else "failed"
+        )
+
+def execute_crew_graph(graph_data, user_prompt, llm_settings=None, max_parallelism=None, listener=None,
+                       response_cache=None, previous_nodes=None, plan=None, verbose=None, system_name=None,
+                       timings=None, report_timings=False):
+    """
+    Execute a crew based on a graph definition
+    
+    Args:
+        graph_data: dict with 'nodes' and 'edges' keys
+        user_prompt: string user input
+        llm_settings: LLMSettings with the caller's credentials; every agent of
+            the run uses an LLM built from them (CrewAI defaults if None), and
+            pooled agents are only reused by runs with the same settings
+        max_parallelism: maximum number of nodes executed concurrently
+            (defaults to MAX_GRAPH_PARALLELISM)
+        listener: optional callable receiving progress event dicts
+            ("run_planned", "node_started", "node_chunk", "node_completed", "node_failed");
+            "node_chunk" token deltas are only emitted when llm_settings.stream is set
+        response_cache: optional ResponseCache; nodes whose inputs were seen
+            before reuse the cached output instead of calling the LLM
+        previous_nodes: optional node records of an earlier run of the graph
+            ({node_id: {"fingerprint", "output"}}); nodes whose persona, prompt
+            and upstream outputs are unchanged reuse their previous output
+        plan: optional compiled GraphPlan of graph_data (saved systems); when
+            not given, graph_data is compiled for this run
+        verbose: CrewAI verbose output and full per-node logging for this run
+            (defaults to AGENT_VERBOSE)
+        system_name: name of the saved system being run, used to label the
+            run's metrics
+        timings: optional RunTimings already holding spans of the request
+            (e.g. graph validation); the run adds its own spans to it
+        report_timings: add a "timings" section to the result (phase and
+            per-node durations, see RunTimings.summary)
+    
+    Returns:
+        dict with final output and step outputs
+    """
+    run = GraphRun(graph_data, user_prompt, llm_settings=llm_settings, max_parallelism=max_parallelism,
+                   listener=listener, response_cache=response_cache, previous_nodes=previous_nodes, plan=plan,
+                   verbose=verbose, system_name=system_name, timings=timings, report_timings=report_timings)
+    try:
+        run.setup()
+        with run.timings.span("execution"):
+            node_outputs = run_dag(run.dependencies, run.run_node, max_workers=run.max_parallelism)
+        return run.result(node_outputs)
         
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
+        metrics.ERRORS.inc(stage="run", type=type(e).__name__)
         logging.error(f"Error in execute_crew_graph: {str(e)}")
         logging.error(f"Full traceback: {error_details}")
         raise
+    finally:
+        run.close()
+
+async def execute_crew_graph_async(graph_data, user_prompt, **options):
+    """
+    Execute a crew graph on the running event loop
+    
+    Same arguments and result as execute_crew_graph. Nodes waiting on the LLM
+    do not hold a thread when CrewAI provides async task execution, so one
+    loop can keep many runs in flight.
+    """
+    run = GraphRun(graph_data, user_prompt, **options)
+    try:
+        # Setup reads storage and builds agents, so it runs off the loop
+        await asyncio.to_thread(run.setup)
+        with run.timings.span("execution"):
+            node_outputs = await run_dag_async(run.dependencies, run.run_node_async, max_concurrency=run.max_parallelism)
+        return run.result(node_outputs)
+        
+    except Exception as e:
+        import traceback
+        error_details = traceback.format_exc()
+        metrics.ERRORS.inc(stage="run", type=type(e).__name__)
+        logging.error(f"Error in execute_crew_graph_async: {str(e)}")
+        logging.error(f"Full traceback: {error_details}")
+        raise
+    finally:
+        await run.join_task_threads()
+        run.close()
 
 # API Routes
 
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    metrics.HTTP_IN_FLIGHT.inc()
+
+@app.after_request
+def record_request_metrics(response):
+    """Record the request's latency and status (labelled by route, not path, to bound cardinality)"""
+    started = g.get('request_started')
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        metrics.HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, method=request.method, endpoint=endpoint)
+        metrics.HTTP_REQUESTS.inc(method=request.method, endpoint=endpoint, status=response.status_code)
+    return response
+
+@app.teardown_request
+def finish_request_metrics(error=None):
+    if g.pop('request_started', None) is not None:
+        metrics.HTTP_IN_FLIGHT.dec()
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Request, run, node and LLM usage metrics in the Prometheus text format"""
+    return app.response_class(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route('/api/personas', methods=['GET'])
 def get_personas():
     """Get all persona definitions"""
@@ -385,15 +789,9 @@ def create_persona():
             if field not in data:
                 return jsonify({"error": f"Missing required field: {field}"}), 400
         
-        personas = load_personas()
-        
         # Check if persona with this name already exists
-        for persona in personas:
-            if persona['name'] == data['name']:
-                return jsonify({"error": "Persona with this name already exists"}), 409
-        
-        personas.append(data)
-        save_personas(personas)
+        if not persona_store.insert(data):
+            return jsonify({"error": "Persona with this name already exists"}), 409
         
         return jsonify({"message": "Persona created successfully", "persona": data}), 201
         
@@ -406,16 +804,15 @@ def update_persona(name):
     """Update an existing persona"""
     try:
         data = request.get_json()
-        personas = load_personas()
         
-        for i, persona in enumerate(personas):
-            if persona['name'] == name:
-                personas[i] = data
-                save_personas(personas)
-                return jsonify({"message": "Persona updated successfully", "persona": data})
+        if persona_store.replace(name, data):
+            agent_pool.invalidate(name)
+            return jsonify({"message": "Persona updated successfully", "persona": data})
         
         return jsonify({"error": "Persona not found"}), 404
         
+    except RecordExistsError:
+        return jsonify({"error": "Persona with this name already exists"}), 409
     except Exception as e:
         logging.error(f"Error updating persona: {e}")
         return jsonify({"error": "Failed to update persona"}), 500
@@ -424,13 +821,10 @@ def update_persona(name):
 def delete_persona(name):
     """Delete a persona"""
     try:
-        personas = load_personas()
-        
-        for i, persona in enumerate(personas):
-            if persona['name'] == name:
-                deleted_persona = personas.pop(i)
-                save_personas(personas)
-                return jsonify({"message": "Persona deleted successfully", "persona": deleted_persona})
+        deleted_persona = persona_store.delete(name)
+        if deleted_persona is not None:
+            agent_pool.invalidate(name)
+            return jsonify({"message": "Persona deleted successfully", "persona": deleted_persona})
         
         return jsonify({"error": "Persona not found"}), 404
         
@@ -438,40 +832,102 @@ def delete_persona(name):
         logging.error(f"Error deleting persona: {e}")
         return jsonify({"error": "Failed to delete persona"}), 500
 
+def parse_run_request(data):
+    """
+    Validate a run request body and return the keyword arguments for execute_crew_graph
+    
+    Raises:
+        ValueError: with a user-facing message if the request is invalid
+    """
+    if not data:
+        raise ValueError("No data provided")
+    
+    timings = RunTimings()
+    graph_data = data.get('graph', {})
+    user_prompt = data.get('user_prompt', '')
+    user_api_key = data.get('user_api_key', '')
+    
+    # Saved systems can be run by name, reusing their compiled execution plan
+    plan = None
+    system_name = data.get('system_name')
+    if system_name:
+        system = find_system_by_name(system_name)
+        if system is None:
+            raise ValueError(f"System '{system_name}' not found")
+        graph_data = system['graph']
+        with timings.span("graph_validation"):
+            plan = plan_cache.get_or_compile(system, timings.timed(find_persona_by_name, "persona_resolution"))
+    
+    logging.info(f"Received request - Graph nodes: {len(graph_data.get('nodes', []))}, Prompt length: {len(user_prompt)}, API key provided: {bool(user_api_key)}")
+    
+    if not graph_data:
+        raise ValueError("No graph data provided")
+    
+    if not user_api_key:
+        raise ValueError("API key is required. Please set your API key in Settings.")
+    
+    previous_nodes = None
+    previous_run_id = data.get('previous_run_id')
+    if previous_run_id:
+        previous_run = run_manager.get(previous_run_id)
+        if previous_run is None:
+            raise ValueError(f"Previous run '{previous_run_id}' not found (it may have expired)")
+        previous_nodes = {
+            node_id: node for node_id, node in previous_run['nodes'].items()
+            if node.get('status') == 'completed' and node.get('fingerprint')
+        }
+    
+    return {
+        "graph_data": graph_data,
+        "user_prompt": user_prompt,
+        # The key is only bound to this run's agents, never set process-wide
+        "llm_settings": LLMSettings(api_key=user_api_key, stream=bool(data.get('stream'))),
+        "max_parallelism": resolve_max_parallelism(data.get('max_parallelism')),
+        "response_cache": response_cache if data.get('use_cache') else None,
+        "previous_nodes": previous_nodes,
+        "plan": plan,
+        "system_name": system_name or None,
+        "verbose": bool(data['verbose']) if data.get('verbose') is not None else None,
+        "timings": timings,
+        "report_timings": bool(data.get('timings'))
+    }
+
+def make_run_job(run_args):
+    """Wrap parsed run arguments into a job for the run manager's executor"""
+    if run_manager.is_async:
+        return lambda listener: execute_crew_graph_async(listener=listener, **run_args)
+    return lambda listener: execute_crew_graph(listener=listener, **run_args)
+
+def jsonify_run_result(body):
+    """
+    Create the JSON response of a run result
+    
+    When the result has a "timings" section, the time taken to serialize the
+    rest of the body is added to it as the "serialization" phase.
+    """
+    timings = body.pop('timings', None)
+    if timings is None:
+        return jsonify(body)
+    start = time.perf_counter()
+    data = app.json.dumps(body)
+    serialization_ms = round((time.perf_counter() - start) * 1000, 3)
+    timings['phases']['serialization'] = serialization_ms
+    timings['total_ms'] = round(timings['total_ms'] + serialization_ms, 3)
+    # body is a non-empty object, so the timings can be appended as its last member
+    data = data[:-1] + ', "timings": ' + app.json.dumps(timings) + '}'
+    return app.response_class(data + "\n", mimetype='application/json')
+
 @app.route('/api/run-crew-graph', methods=['POST'])
 def run_crew_graph():
     """Execute a crew based on a graph definition"""
     try:
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
-        
-        graph_data = data.get('graph', {})
-        user_prompt = data.get('user_prompt', '')
-        user_api_key = data.get('user_api_key', '')
+        run_args = parse_run_request(request.get_json())
         
-        logging.info(f"Received request - Graph nodes: {len(graph_data.get('nodes', []))}, Prompt length: {len(user_prompt)}, API key provided: {bool(user_api_key)}")
-        
-        if not graph_data:
-            return jsonify({"error": "No graph data provided"}), 400
-        
-        if not user_api_key:
-            return jsonify({"error": "API key is required. Please set your API key in Settings."}), 400
-        
-        # Set the user's API key for this request - CrewAI uses litellm which needs both
-        import openai
-        import os
-        
-        # Set both the openai client key and environment variable
-        openai.api_key = user_api_key
-        os.environ['OPENAI_API_KEY'] = user_api_key
-        
-        logging.info("API key configured for both OpenAI client and environment")
         logging.info("Starting crew execution...")
-        result = execute_crew_graph(graph_data, user_prompt)
+        # Recorded like background runs so it can be used as a previous_run_id
+        run = run_manager.run(make_run_job(run_args))
         logging.info("Crew execution completed successfully")
-        return jsonify(result)
+        return jsonify_run_result(dict(run['result'], run_id=run['run_id']))
         
     except ValueError as e:
         logging.error(f"Validation error: {str(e)}")
@@ -490,6 +946,158 @@ def run_crew_graph():
             "type": type(e).__name__
         }), 500
 
+@app.route('/api/runs', methods=['POST'])
+def submit_run():
+    """Queue a crew graph run in the background and return its id immediately"""
+    try:
+        run_args = parse_run_request(request.get_json())
+        run = run_manager.submit(make_run_job(run_args))
+        logging.info(f"Queued run {run['run_id']}")
+        return jsonify(run), 202
+        
+    except ValueError as e:
+        logging.error(f"Validation error: {str(e)}")
+        return jsonify({"error": str(e)}), 400
+    except QueueFullError as e:
+        logging.warning(str(e))
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "5"}
+    except Exception as e:
+        logging.error(f"Error queueing run: {e}")
+        return jsonify({"error": "Failed to queue run"}), 500
+
+def iter_ndjson(stream):
+    """Parse a streamed NDJSON body one line at a time, skipping blank lines"""
+    for line in stream:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                raise ValueError(f"Invalid JSON line in request body: {line[:100]!r}")
+
+def prepare_batch_run(options):
+    """
+    Validate the options of a batch and compile its graph once
+    
+    Returns:
+        keyword arguments for execute_crew_graph, without user_prompt
+    """
+    if options and options.get('previous_run_id'):
+        raise ValueError("previous_run_id is not supported for batch runs")
+    run_args = parse_run_request(options)
+    del run_args['user_prompt']
+    # Every prompt records its own spans
+    del run_args['timings']
+    # Nobody listens to token deltas of batch prompts
+    run_args['llm_settings'] = dataclasses.replace(run_args['llm_settings'], stream=False)
+    if run_args['plan'] is None:
+        run_args['plan'] = compile_graph(run_args['graph_data'], find_persona_by_name)
+    return run_args
+
+@app.route('/api/batch-runs', methods=['POST'])
+def run_batch_graph():
+    """Run one system or graph against many prompts, streaming results as NDJSON"""
+    try:
+        if request.mimetype == 'application/x-ndjson':
+            # First line: batch options; every following line: one prompt
+            lines = iter_ndjson(request.stream)
+            options = next(lines, None)
+            prompts = lines
+        else:
+            options = request.get_json()
+            prompts = (options or {}).get('prompts')
+            if not isinstance(prompts, list):
+                raise ValueError("'prompts' must be a list of prompts")
+        
+        run_args = prepare_batch_run(options)
+        max_concurrency = resolve_batch_concurrency(options.get('max_concurrency'))
+    except ValueError as e:
+        logging.error(f"Validation error: {str(e)}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logging.error(f"Error preparing batch: {e}")
+        return jsonify({"error": "Failed to prepare batch"}), 500
+    
+    logging.info(f"Starting batch run (max concurrency: {max_concurrency})...")
+    
+    def generate():
+        start = time.time()
+        counts = {"succeeded": 0, "failed": 0}
+        try:
+            for item in run_batch(prompts, lambda user_prompt: execute_crew_graph(user_prompt=user_prompt, **run_args),
+                                  max_concurrency=max_concurrency):
+                counts[item["status"]] += 1
+                yield json.dumps(item) + "\n"
+        except ValueError as e:
+            # Malformed line in a streamed body: report it and stop reading
+            yield json.dumps({"status": "failed", "error": str(e), "type": "ValueError"}) + "\n"
+        elapsed = round(time.time() - start, 3)
+        logging.info(f"Batch run finished: {counts['succeeded']} succeeded, {counts['failed']} failed in {elapsed}s")
+        yield json.dumps({"done": True, **counts, "elapsed": elapsed}) + "\n"
+    
+    return app.response_class(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/api/runs/<run_id>', methods=['GET'])
+def get_run(run_id):
+    """Get the status, per-node progress and (when finished) result of a run"""
+    run = run_manager.get(run_id)
+    if run is None:
+        return jsonify({"error": "Run not found"}), 404
+    return jsonify(run)
+
+@app.route('/api/runs/<run_id>/trace', methods=['GET'])
+def get_run_trace(run_id):
+    """Download the timeline of a finished run in the Chrome trace event format"""
+    if run_manager.get(run_id) is None:
+        return jsonify({"error": "Run not found"}), 404
+    spans = run_manager.get_trace(run_id)
+    if spans is None:
+        return jsonify({"error": "The run has no trace yet (it is still in progress)"}), 404
+    try:
+        trace = chrome_trace(spans, group_by=request.args.get('group_by', 'node'), name=f"run {run_id}")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(trace), 200, {"Content-Disposition": f'attachment; filename="run-{run_id}.trace.json"'}
+
+@app.route('/api/runs/<run_id>/events', methods=['GET'])
+def stream_run_events(run_id):
+    """Stream the progress events of a run as Server-Sent Events"""
+    if run_manager.get(run_id) is None:
+        return jsonify({"error": "Run not found"}), 404
+    
+    # EventSource sends Last-Event-ID when it reconnects, so the stream resumes where it stopped
+    try:
+        last_seq = int(request.headers.get('Last-Event-ID', request.args.get('after', -1)))
+    except ValueError:
+        last_seq = -1
+    
+    def generate():
+        nonlocal last_seq
+        while True:
+            update = run_manager.wait_for_events(run_id, after=last_seq, timeout=15)
+            if update is None:
+                return
+            events, finished = update
+            if not events and not finished:
+                # Comment line keeps the connection open through proxy read timeouts
+                yield ": keep-alive\n\n"
+                continue
+            for event in events:
+                last_seq = event['seq']
+                yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            if finished:
+                return
+    
+    return app.response_class(
+        generate(),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -515,8 +1123,8 @@ def get_special_nodes():
 def get_systems():
     """Get all saved system configurations"""
     try:
-        systems = load_systems()
-        return jsonify(systems)
+        # Served as already-serialized JSON instead of re-encoding every graph
+        return app.response_class(system_store.to_json(), mimetype='application/json')
     except Exception as e:
         logging.error(f"Error loading systems: {e}")
         return jsonify({"error": "Failed to load systems"}), 500
@@ -532,13 +1140,6 @@ def save_system():
             if field not in data:
                 return jsonify({"error": f"Missing required field: {field}"}), 400
         
-        systems = load_systems()
-        
-        # Check if system with this name already exists
-        for system in systems:
-            if system['name'] == data['name']:
-                return jsonify({"error": "System with this name already exists"}), 409
-        
         # Add metadata
         system_data = {
             "name": data['name'],
@@ -548,8 +1149,9 @@ def save_system():
             "updated_at": datetime.datetime.now().isoformat()
         }
         
-        systems.append(system_data)
-        save_systems(systems)
+        # Check if system with this name already exists
+        if not system_store.insert(system_data):
+            return jsonify({"error": "System with this name already exists"}), 409
         
         return jsonify({"message": "System saved successfully", "system": system_data}), 201
         
@@ -575,22 +1177,24 @@ def update_system(name):
     """Update an existing system"""
     try:
         data = request.get_json()
-        systems = load_systems()
-        
-        for i, system in enumerate(systems):
-            if system['name'] == name:
-                # Update the system
-                systems[i].update({
-                    "name": data.get('name', name),
-                    "description": data.get('description', system.get('description', '')),
-                    "graph": data.get('graph', system['graph']),
-                    "updated_at": datetime.datetime.now().isoformat()
-                })
-                save_systems(systems)
-                return jsonify({"message": "System updated successfully", "system": systems[i]})
+        system = system_store.get(name)
+        
+        if system:
+            # Update a copy so the cached record is only swapped once it is persisted
+            updated_system = dict(system)
+            updated_system.update({
+                "name": data.get('name', name),
+                "description": data.get('description', system.get('description', '')),
+                "graph": data.get('graph', system['graph']),
+                "updated_at": datetime.datetime.now().isoformat()
+            })
+            if system_store.replace(name, updated_system):
+                return jsonify({"message": "System updated successfully", "system": updated_system})
         
         return jsonify({"error": "System not found"}), 404
         
+    except RecordExistsError:
+        return jsonify({"error": "System with this name already exists"}), 409
     except Exception as e:
         logging.error(f"Error updating system: {e}")
         return jsonify({"error": "Failed to update system"}), 500
@@ -599,13 +1203,9 @@ def update_system(name):
 def delete_system(name):
     """Delete a system"""
     try:
-        systems = load_systems()
-        
-        for i, system in enumerate(systems):
-            if system['name'] == name:
-                deleted_system = systems.pop(i)
-                save_systems(systems)
-                return jsonify({"message": "System deleted successfully", "system": deleted_system})
+        deleted_system = system_store.delete(name)
+        if deleted_system is not None:
+            return jsonify({"message": "System deleted successfully", "system": deleted_system})
         
         return jsonify({"error": "System not found"}), 404
         
@@ -613,6 +1213,23 @@ def delete_system(name):
         logging.error(f"Error deleting system: {e}")
         return jsonify({"error": "Failed to delete system"}), 500
 
+def check_api_key(api_key):
+    """Ask OpenAI whether a key is valid; errors unrelated to the key are raised"""
+    if LLM_PROVIDER == 'mock':
+        # Offline load tests: any well-formed key is accepted
+        return True
+    # Use a dedicated client so the key is never set globally
+    client = LLMSettings(api_key=api_key).create_openai_client()
+    try:
+        # Make a simple test call to validate the key
+        client.models.list()
+    except Exception as e:
+        # Authentication and permission errors mean the key itself was rejected
+        if getattr(e, 'status_code', None) in (401, 403):
+            return False
+        raise
+    return True
+
 @app.route('/api/validate-api-key', methods=['POST'])
 def validate_api_key():
     """Validate a user-provided API key"""
@@ -627,25 +1244,21 @@ def validate_api_key():
         if not api_key.startswith('sk-'):
             return jsonify({"error": "Invalid API key format. Should start with 'sk-'"}), 400
         
-        # Test the API key with a simple OpenAI call
+        # Test the API key with a simple OpenAI call, unless it was checked recently
         try:
-            import openai
-            openai.api_key = api_key
-            
-            # Make a simple test call to validate the key
-            response = openai.models.list()
-            
-            # If we get here, the key is valid
-            return jsonify({
-                "message": "API key is valid",
-                "valid": True
-            })
-            
+            valid = key_validation_cache.validate(api_key, check_api_key)
         except Exception as e:
             # Log only the error type, not the full error which might contain the key
             error_type = type(e).__name__
             logging.error(f"API key validation failed with error type: {error_type}")
-            return jsonify({"error": "Invalid API key. Please check your key and try again."}), 400
+            valid = False
+        
+        if valid:
+            return jsonify({
+                "message": "API key is valid",
+                "valid": True
+            })
+        return jsonify({"error": "Invalid API key. Please check your key and try again."}), 400
             
     except Exception as e:
         # Log only the error type, not the full error
@@ -663,13 +1276,8 @@ def test_crew():
         if not user_api_key:
             return jsonify({"error": "API key is required"}), 400
         
-        # Set the user's API key - CrewAI uses litellm which needs both
-        import openai
-        import os
-        
-        # Set both the openai client key and environment variable
-        openai.api_key = user_api_key
-        os.environ['OPENAI_API_KEY'] = user_api_key
+        # Bind the user's API key to this test's agent only
+        llm = LLMSettings(api_key=user_api_key).create_llm()
         
         logging.info("API key configured for debug test")
         
@@ -681,7 +1289,8 @@ def test_crew():
             role="Test Agent",
             goal="Test that CrewAI is working",
             backstory="A simple test agent to verify functionality",
-            verbose=True,
+            llm=llm,
+            verbose=AGENT_VERBOSE,
             allow_delegation=False
         )
         
@@ -697,7 +1306,7 @@ def test_crew():
             agents=[test_agent],
             tasks=[test_task],
             process=Process.sequential,
-            verbose=True
+            verbose=AGENT_VERBOSE
         )
         
         result = crew.kickoff()
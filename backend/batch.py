@@ -0,0 +1,95 @@
+"""
+Running one graph against many prompts.
+
+Prompts are consumed lazily from any iterable (a JSON list, a streamed NDJSON
+request body, a file being read) and executed on a bounded thread pool, so a
+batch never holds more than `max_concurrency` prompts in flight regardless of
+its size. Results are yielded as soon as each prompt finishes, which is not
+necessarily input order; every result carries the prompt's index and id.
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "4"))
+BATCH_MAX_CONCURRENCY = int(os.environ.get("BATCH_MAX_CONCURRENCY", "16"))
+
+
+def resolve_batch_concurrency(value=None):
+    """Validate a per-batch concurrency setting, capped at BATCH_MAX_CONCURRENCY"""
+    if value is None or value == '':
+        return min(BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"max_concurrency must be a positive integer, got {value!r}")
+    if value < 1:
+        raise ValueError(f"max_concurrency must be a positive integer, got {value}")
+    return min(value, BATCH_MAX_CONCURRENCY)
+
+
+def parse_prompt_item(item, index):
+    """
+    Normalize one batch entry into (id, user_prompt).
+
+    An entry is either a prompt string or an object with "user_prompt" and an
+    optional "id" (the index is used when it has none).
+
+    Raises:
+        ValueError: for entries without a prompt
+    """
+    if isinstance(item, str):
+        return index, item
+    if isinstance(item, dict) and isinstance(item.get('user_prompt'), str):
+        return item.get('id', index), item['user_prompt']
+    raise ValueError(f"Prompt {index} must be a string or an object with a 'user_prompt' string")
+
+
+def run_batch(items, run_prompt, max_concurrency=None):
+    """
+    Run `run_prompt(user_prompt)` for every entry of `items`.
+
+    Args:
+        items: iterable of prompt entries (see parse_prompt_item), read lazily
+        run_prompt: callable returning the result of one prompt
+        max_concurrency: maximum number of prompts running at the same time
+
+    Yields:
+        dicts with "index", "id" and either "status": "succeeded" and
+        "result", or "status": "failed", "error" and "type"; a prompt that
+        fails does not stop the batch
+    """
+    max_concurrency = resolve_batch_concurrency(max_concurrency)
+    entries = enumerate(items)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="crew-batch") as pool:
+        running = {}
+        try:
+            while True:
+                while len(running) < max_concurrency:
+                    entry = next(entries, None)
+                    if entry is None:
+                        break
+                    index, item = entry
+                    try:
+                        prompt_id, user_prompt = parse_prompt_item(item, index)
+                    except ValueError as e:
+                        yield {"index": index, "id": None, "status": "failed", "error": str(e), "type": "ValueError"}
+                        continue
+                    running[pool.submit(run_prompt, user_prompt)] = (index, prompt_id)
+                if not running:
+                    return
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    index, prompt_id = running.pop(future)
+                    try:
+                        yield {"index": index, "id": prompt_id, "status": "succeeded", "result": future.result()}
+                    except Exception as e:
+                        logging.error(f"Batch prompt {index} failed: {type(e).__name__}: {e}")
+                        yield {"index": index, "id": prompt_id, "status": "failed", "error": str(e), "type": type(e).__name__}
+        finally:
+            # The consumer stopped early (e.g. the client disconnected): drop what has not started
+            for future in running:
+                future.cancel()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent graph runs per process: threaded vs async executor.
+
+Runs go through the real executor (plan compilation, agent pool, CrewAI
+tasks, scheduler, run manager) with the deterministic mock LLM
+(LLM_PROVIDER=mock), whose calls only wait for --latency seconds. The numbers
+therefore measure how many runs the executor keeps in flight, not model
+speed. No server, API key or network is needed.
+
+    python benchmark_runs.py --runs 200 --latency 0.5
+"""
+
+import argparse
+import logging
+import os
+import threading
+import time
+import tracemalloc
+
+# The mock provider must be selected before the backend modules read their settings
+os.environ.setdefault("LLM_PROVIDER", "mock")
+
+from runs import RunManager, RUN_WORKERS, RUN_ASYNC_LIMIT
+
+# Reframer -> two specialists -> editor, like the example systems
+GRAPH = {
+    "nodes": [
+        {"id": "reframer", "persona": "Default Prompt Reframer"},
+        {"id": "specialist_a", "persona": "Default Civic Information Specialist"},
+        {"id": "specialist_b", "persona": "Default Public Communication Analyst"},
+        {"id": "editor", "persona": "Default Final Editor"}
+    ],
+    "edges": [
+        {"source": "reframer", "target": "specialist_a"},
+        {"source": "reframer", "target": "specialist_b"},
+        {"source": "specialist_a", "target": "editor"},
+        {"source": "specialist_b", "target": "editor"},
+        {"source": "prompt", "target": "editor"}
+    ]
+}
+
+PROMPT = "Why did my property tax bill go up this year, and who can I talk to about it?"
+
+
+def make_job(executor, run_number):
+    """Build a run job for one benchmark run (prompts differ so no two runs are identical)"""
+    from app import execute_crew_graph, execute_crew_graph_async, LLMSettings
+
+    run_args = {
+        "graph_data": GRAPH,
+        "user_prompt": f"{PROMPT} (#{run_number})",
+        "llm_settings": LLMSettings(api_key="sk-benchmark", provider="mock")
+    }
+    if executor == "async":
+        return lambda listener: execute_crew_graph_async(listener=listener, **run_args)
+    return lambda listener: execute_crew_graph(listener=listener, **run_args)
+
+
+def benchmark(executor, runs, workers, max_concurrent):
+    """Submit `runs` runs at once and wait for all of them"""
+    manager = RunManager(
+        max_workers=workers,
+        max_queued=runs,
+        history_limit=runs,
+        directory=None,
+        executor=executor,
+        max_concurrent=max_concurrent
+    )
+    tracemalloc.start()
+    start = time.perf_counter()
+    run_ids = [manager.submit(make_job(executor, number))["run_id"] for number in range(runs)]
+
+    peak_threads = threading.active_count()
+    while True:
+        peak_threads = max(peak_threads, threading.active_count())
+        if all(manager.get(run_id)["finished_at"] for run_id in run_ids):
+            break
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    failed = sum(1 for run_id in run_ids if manager.get(run_id)["status"] != "succeeded")
+    manager.shutdown(timeout=5)
+    return {
+        "executor": executor,
+        "elapsed": elapsed,
+        "runs_per_second": runs / elapsed,
+        "peak_threads": peak_threads,
+        "peak_memory_mb": peak_memory / 1024 / 1024,
+        "failed": failed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=200, help="number of runs submitted at once")
+    parser.add_argument('--latency', type=float, default=0.5, help="seconds per mock LLM call")
+    parser.add_argument('--workers', type=int, default=RUN_WORKERS, help="run threads of the threaded executor")
+    parser.add_argument('--max-concurrent', type=int, default=RUN_ASYNC_LIMIT, help="concurrent runs of the async executor")
+    args = parser.parse_args()
+
+    os.environ["MOCK_LLM_LATENCY"] = f"fixed:{args.latency}"
+    import app  # noqa: F401 (configures logging on import)
+    # Keeps the benchmark's own output readable
+    logging.getLogger().setLevel(logging.WARNING)
+
+    # Critical path of the graph is 3 nodes deep
+    print(f"{args.runs} runs, {len(GRAPH['nodes'])} nodes each, {args.latency}s per LLM call "
+          f"(ideal run latency {3 * args.latency:.1f}s)\n")
+    print(f"{'executor':<10}{'elapsed':>10}{'runs/s':>10}{'threads':>10}{'memory':>12}{'failed':>8}")
+    for executor in ("thread", "async"):
+        result = benchmark(executor, args.runs, args.workers, args.max_concurrent)
+        print(f"{result['executor']:<10}{result['elapsed']:>9.2f}s{result['runs_per_second']:>10.1f}"
+              f"{result['peak_threads']:>10}{result['peak_memory_mb']:>10.1f}MB{result['failed']:>8}")
+
+
+if __name__ == "__main__":
+    main()
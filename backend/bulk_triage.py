@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Run a file of citizen messages through a saved system, without the HTTP API
+
+Usage:
+    python bulk_triage.py messages.jsonl --system "Civic Triage" --output results.jsonl
+
+The input is a JSONL file (one object per line) or a CSV file with a header
+row; each record needs a prompt column (--prompt-field, default user_prompt)
+and may have an id column (--id-field, default id; the line number is used
+otherwise). Both files are streamed, so inputs of any size run in constant
+memory.
+
+Results are appended to the output file one line per message as they finish.
+If the output file already exists, messages that already succeeded are
+skipped, so an interrupted run continues where it stopped; failed messages
+are retried. Use --restart to start over.
+
+The OpenAI key is read from --api-key or the OPENAI_API_KEY environment
+variable.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from batch import run_batch, BATCH_CONCURRENCY
+
+def read_records(path, input_format):
+    """Yield the records of a JSONL or CSV file with their line numbers"""
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        if input_format == 'csv':
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+            return
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError:
+                print(f"⚠ Skipping invalid JSON on line {line_number}", file=sys.stderr)
+
+def read_prompts(path, input_format, prompt_field, id_field, done_ids):
+    """Yield {"id", "user_prompt"} batch entries, skipping ids in `done_ids`"""
+    for line_number, record in read_records(path, input_format):
+        if not isinstance(record, dict) or not record.get(prompt_field):
+            print(f"⚠ Skipping line {line_number}: no '{prompt_field}'", file=sys.stderr)
+            continue
+        prompt_id = record.get(id_field) or line_number
+        if str(prompt_id) in done_ids:
+            continue
+        yield {"id": prompt_id, "user_prompt": record[prompt_field]}
+
+def load_checkpoint(path):
+    """Return the ids that already succeeded in an existing output file"""
+    done_ids = set()
+    if not os.path.exists(path):
+        return done_ids
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                # Last line of an interrupted run
+                continue
+            if result.get('status') == 'succeeded':
+                done_ids.add(str(result.get('id')))
+    return done_ids
+
+def open_output(path, restart):
+    """Open the output file for appending, terminating a partially written last line"""
+    if restart or not os.path.exists(path):
+        return open(path, 'w', encoding='utf-8')
+    partial = False
+    with open(path, 'rb') as f:
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            partial = f.read(1) != b'\n'
+    output = open(path, 'a', encoding='utf-8')
+    if partial:
+        output.write('\n')
+    return output
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSONL/CSV file of prompts through a saved system")
+    parser.add_argument('input', help="JSONL or CSV file of messages")
+    parser.add_argument('--system', required=True, help="name of the saved system to run")
+    parser.add_argument('--output', required=True, help="JSONL file the results are appended to")
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help="input format (default: from the file extension)")
+    parser.add_argument('--prompt-field', default='user_prompt', help="field holding the message (default: %(default)s)")
+    parser.add_argument('--id-field', default='id', help="field holding the message id (default: %(default)s)")
+    parser.add_argument('--concurrency', type=int, default=BATCH_CONCURRENCY,
+                        help="messages processed at the same time (default: %(default)s, "
+                             "capped at BATCH_MAX_CONCURRENCY)")
+    parser.add_argument('--api-key', default=os.environ.get('OPENAI_API_KEY', ''), help="OpenAI API key")
+    parser.add_argument('--use-cache', action='store_true', help="reuse cached node outputs")
+    parser.add_argument('--restart', action='store_true', help="ignore and overwrite an existing output file")
+    args = parser.parse_args()
+
+    input_format = args.format or ('csv' if args.input.lower().endswith('.csv') else 'jsonl')
+    if not os.path.exists(args.input):
+        print(f"Error: {args.input} not found")
+        sys.exit(1)
+
+    # Imported here so --help works without the backend's dependencies
+    from app import prepare_batch_run, execute_crew_graph
+
+    try:
+        run_args = prepare_batch_run({
+            "system_name": args.system,
+            "user_api_key": args.api_key,
+            "use_cache": args.use_cache
+        })
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    done_ids = set() if args.restart else load_checkpoint(args.output)
+    if done_ids:
+        print(f"Resuming: {len(done_ids)} messages already done in {args.output}")
+
+    prompts = read_prompts(args.input, input_format, args.prompt_field, args.id_field, done_ids)
+    counts = {"succeeded": 0, "failed": 0}
+    start = time.time()
+    print(f"Running {args.input} through '{args.system}' ({args.concurrency} at a time)...")
+
+    with open_output(args.output, args.restart) as output:
+        results = run_batch(
+            prompts,
+            lambda user_prompt: execute_crew_graph(user_prompt=user_prompt, **run_args),
+            max_concurrency=args.concurrency
+        )
+        for result in results:
+            del result['index']
+            output.write(json.dumps(result, ensure_ascii=False) + '\n')
+            output.flush()
+            counts[result['status']] += 1
+            if result['status'] == 'failed':
+                print(f"  ⚠ {result['id']}: {result['type']}: {result['error']}")
+            done = counts['succeeded'] + counts['failed']
+            if done % 10 == 0:
+                print(f"  {done} done ({done / (time.time() - start):.2f} messages/s)")
+
+    print(f"\n✅ {counts['succeeded']} succeeded, {counts['failed']} failed in {time.time() - start:.1f}s")
+    print(f"Results: {args.output}")
+
+if __name__ == "__main__":
+    main()
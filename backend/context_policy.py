@@ -0,0 +1,175 @@
+"""
+Context policies for graph edges.
+
+By default a node receives the full raw outputs of its upstream nodes, so the
+prompt of every node grows along chains like reframer -> specialist ->
+analyst -> editor. An edge can instead pass a reduced form of its source's
+output:
+
+    "full"      the raw output (default)
+    "truncate"  the first max_tokens tokens (default CONTEXT_TRUNCATE_TOKENS)
+    "extract"   the structured lines of the output (headings, list items,
+                "Key: value" lines, or else the first sentence of each
+                paragraph), cut to max_tokens (default CONTEXT_EXTRACT_TOKENS)
+    "summary"   an LLM summary of at most max_tokens tokens (default
+                CONTEXT_SUMMARY_TOKENS), cached by content so every consumer
+                and every later run with the same upstream output reuses it
+
+An edge's policy is its "context" field, either a policy name or
+{"policy": <name>, "max_tokens": <n>}; edges without one use the graph's
+"context_policy", or CONTEXT_POLICY (default "full").
+
+Tokens are counted with tiktoken when it is installed, and estimated at four
+characters per token otherwise.
+"""
+
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+CONTEXT_POLICY = os.environ.get("CONTEXT_POLICY", "full")
+CONTEXT_TRUNCATE_TOKENS = int(os.environ.get("CONTEXT_TRUNCATE_TOKENS", "500"))
+CONTEXT_EXTRACT_TOKENS = int(os.environ.get("CONTEXT_EXTRACT_TOKENS", "300"))
+CONTEXT_SUMMARY_TOKENS = int(os.environ.get("CONTEXT_SUMMARY_TOKENS", "200"))
+
+DEFAULT_MAX_TOKENS = {
+    "full": None,
+    "truncate": CONTEXT_TRUNCATE_TOKENS,
+    "extract": CONTEXT_EXTRACT_TOKENS,
+    "summary": CONTEXT_SUMMARY_TOKENS
+}
+
+SUMMARY_PROMPT = (
+    "Summarize the following text in at most {max_tokens} tokens for another analyst who will build on it. "
+    "Keep every fact, figure, name, decision and open question; drop repetition and filler. "
+    "Answer with the summary only.\n\n{text}"
+)
+
+_CHARS_PER_TOKEN = 4
+_encoding = None
+
+
+@dataclass(frozen=True)
+class ContextPolicy:
+    """How an edge passes its source's output to its target"""
+    mode: str = "full"
+    max_tokens: Optional[int] = None
+
+
+def parse_context_policy(spec, default=None):
+    """
+    Parse an edge's "context" field into a ContextPolicy.
+
+    Args:
+        spec: None, a policy name or {"policy": <name>, "max_tokens": <n>}
+        default: ContextPolicy used when spec is None (CONTEXT_POLICY if None)
+
+    Raises:
+        ValueError: for unknown policies or invalid token limits
+    """
+    if spec is None:
+        return default if default is not None else parse_context_policy(CONTEXT_POLICY, ContextPolicy())
+    if isinstance(spec, str):
+        mode, max_tokens = spec, None
+    elif isinstance(spec, dict):
+        mode, max_tokens = spec.get("policy", "full"), spec.get("max_tokens")
+    else:
+        raise ValueError(f"Context policy must be a name or an object, got {spec!r}")
+
+    if mode not in DEFAULT_MAX_TOKENS:
+        raise ValueError(f"Unknown context policy {mode!r}, expected one of: {', '.join(DEFAULT_MAX_TOKENS)}")
+    if mode == "full":
+        return ContextPolicy()
+    if max_tokens is None:
+        max_tokens = DEFAULT_MAX_TOKENS[mode]
+    if isinstance(max_tokens, bool) or not isinstance(max_tokens, int) or max_tokens < 1:
+        raise ValueError(f"max_tokens of the {mode!r} context policy must be a positive integer, got {max_tokens!r}")
+    return ContextPolicy(mode, max_tokens)
+
+
+def _get_encoding():
+    """Return the tiktoken encoding, or False when tiktoken is not installed"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    return _encoding
+
+
+def count_tokens(text):
+    """Count (or estimate, without tiktoken) the tokens of a text"""
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return -(-len(text) // _CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Cut a text to at most `max_tokens` tokens, noting what was left out"""
+    encoding = _get_encoding()
+    if encoding:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        kept, total = encoding.decode(tokens[:max_tokens]), len(tokens)
+    else:
+        if len(text) <= max_tokens * _CHARS_PER_TOKEN:
+            return text
+        kept, total = text[:max_tokens * _CHARS_PER_TOKEN], count_tokens(text)
+    return f"{kept.rstrip()}\n[truncated: {max_tokens} of {total} tokens]"
+
+
+_STRUCTURED_LINE = re.compile(r'^\s*(#{1,6}\s|[-*+•]\s|\d+[.)]\s|\*\*[^*]+\*\*|[A-Z][\w /&()-]{0,40}:\s*\S)')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s')
+
+
+def extract_structure(text, max_tokens):
+    """
+    Keep the structured lines of a text: headings, list items and "Key: value"
+    lines, or the first sentence of each paragraph when there are none.
+    """
+    lines = [line.rstrip() for line in text.splitlines() if _STRUCTURED_LINE.match(line)]
+    if not lines:
+        paragraphs = [paragraph.strip() for paragraph in re.split(r'\n\s*\n', text) if paragraph.strip()]
+        lines = [_SENTENCE_END.split(' '.join(paragraph.split()), maxsplit=1)[0] for paragraph in paragraphs]
+    return truncate_to_tokens('\n'.join(lines), max_tokens)
+
+
+def summary_cache_key(text, max_tokens, llm_settings=None):
+    """Key of a cached summary: the summarized text, its budget and the model"""
+    payload = {
+        "kind": "context_summary",
+        "text": text,
+        "max_tokens": max_tokens,
+        "model": llm_settings.model if llm_settings else None,
+        "provider": llm_settings.provider if llm_settings else None
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def apply_context_policy(text, policy, summarize=None):
+    """
+    Reduce an upstream output according to an edge's policy.
+
+    Args:
+        summarize: callable(text, max_tokens) returning a summary; required
+            for the "summary" policy
+
+    Returns:
+        the text passed to the target node; outputs already within the
+        policy's token budget are passed unchanged
+    """
+    if policy.mode == "full" or count_tokens(text) <= policy.max_tokens:
+        return text
+    if policy.mode == "extract":
+        return extract_structure(text, policy.max_tokens)
+    if policy.mode == "summary":
+        return summarize(text, policy.max_tokens)
+    return truncate_to_tokens(text, policy.max_tokens)
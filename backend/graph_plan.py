@@ -0,0 +1,217 @@
+"""
+Compiled execution plans for crew graphs.
+
+Compiling a graph validates its nodes, resolves every persona, works out each
+node's context sources (including the special "prompt" node) and the context
+policy of each edge, the dependency graph, execution levels and entry points,
+and keeps each task description as
+a template with a slot for the user prompt. None of this depends on the prompt
+or the caller's credentials, so a plan is computed once per saved system
+version and reused; a run only renders the descriptions and builds the tasks.
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from context_policy import ContextPolicy, parse_context_policy
+from graph_scheduler import topological_levels
+
+PLAN_CACHE_SIZE = int(os.environ.get("PLAN_CACHE_SIZE", "256"))
+
+PROMPT_NODE_ID = 'prompt'
+
+
+@dataclass
+class PlannedNode:
+    """A validated graph node with its resolved persona and context sources"""
+    node_id: str
+    node: dict
+    persona: dict
+    # Upstream node ids whose outputs are passed as context, in edge order
+    context: List[str] = field(default_factory=list)
+    # Whether an edge from the "prompt" node feeds the original prompt to this node
+    receives_prompt: bool = False
+    # Context policies of the incoming edges that do not pass the full output
+    context_policies: Dict[str, ContextPolicy] = field(default_factory=dict)
+
+    def policy_for(self, source_id):
+        """Return the context policy of the edge from `source_id`"""
+        return self.context_policies.get(source_id, ContextPolicy())
+
+    @property
+    def needs_summary(self):
+        """Whether building this node's context may call the LLM"""
+        return any(policy.mode == "summary" for policy in self.context_policies.values())
+
+    def render_description(self, user_prompt):
+        """Fill the prompt slot of the persona's task description"""
+        description = self.persona['task']['description']
+        if user_prompt and '{user_prompt}' in description:
+            description = description.format(user_prompt=user_prompt)
+        if self.receives_prompt and user_prompt:
+            description = f"Original user prompt: {user_prompt}\n\n{description}"
+        return description
+
+
+@dataclass
+class GraphPlan:
+    """Everything needed to run a graph except the prompt and the credentials"""
+    nodes: Dict[str, PlannedNode]
+    dependencies: Dict[str, List[str]]
+    levels: List[List[str]]
+    entry_points: List[str]
+
+    @property
+    def order(self):
+        """Node ids in a valid execution order"""
+        return [node_id for level in self.levels for node_id in level]
+
+    def is_current(self, find_persona):
+        """Check that none of the resolved personas changed since compilation"""
+        for planned in self.nodes.values():
+            current = find_persona(planned.persona['name'])
+            if current is not planned.persona and current != planned.persona:
+                return False
+        return True
+
+
+def compile_graph(graph_data, find_persona):
+    """
+    Validate a graph and compile it into a GraphPlan.
+
+    Args:
+        graph_data: dict with 'nodes' and 'edges' keys
+        find_persona: callable returning the persona dict for a name, or None
+
+    Raises:
+        ValueError: for graphs that cannot run (no nodes, nodes without a
+            persona, no resolvable persona at all, cycles, invalid context
+            policies)
+    """
+    nodes = graph_data.get('nodes', [])
+    edges = graph_data.get('edges', [])
+    try:
+        default_policy = parse_context_policy(graph_data.get('context_policy'))
+    except ValueError as e:
+        raise ValueError(f"Invalid graph context_policy: {e}")
+
+    if not nodes:
+        raise ValueError("No nodes provided in graph")
+
+    planned_nodes = {}
+    blank_nodes = []
+    for node in nodes:
+        node_id = node.get('id')
+        persona_name = node.get('persona')
+
+        if not node_id:
+            logging.warning(f"Skipping node with missing id: {node}")
+            continue
+
+        # The "prompt" node is provided by the run itself
+        if node_id == PROMPT_NODE_ID:
+            continue
+
+        if not persona_name or persona_name.strip() == '':
+            blank_nodes.append(node_id)
+            logging.warning(f"Node '{node_id}' has no persona assigned")
+            continue
+
+        persona = find_persona(persona_name)
+        if not persona:
+            logging.warning(f"Persona '{persona_name}' not found for node {node_id}")
+            continue
+
+        description = persona['task']['description']
+        if '{user_prompt}' in description:
+            try:
+                # Reject templates whose placeholders cannot be filled in; descriptions without the
+                # slot are used as written, literal braces included
+                description.format(user_prompt='')
+            except (KeyError, IndexError, ValueError) as e:
+                logging.error(f"Failed to create task for node '{node_id}' with persona '{persona_name}': {str(e)}")
+                continue
+
+        planned_nodes[node_id] = PlannedNode(node_id=node_id, node=node, persona=persona)
+
+    # Check for blank nodes and provide clear error message
+    if blank_nodes:
+        blank_nodes_str = ', '.join(blank_nodes)
+        raise ValueError(f"Cannot run workflow: {len(blank_nodes)} node(s) without personas assigned ({blank_nodes_str}). Please assign personas to all nodes before running.")
+
+    if not planned_nodes:
+        raise ValueError("No valid personas found for any nodes in the graph. Please ensure the persona names match those in personas.json")
+
+    dependencies = {node_id: [] for node_id in planned_nodes}
+    for edge in edges:
+        source_id = edge.get('source')
+        target_id = edge.get('target')
+
+        if target_id not in planned_nodes or (source_id != PROMPT_NODE_ID and source_id not in planned_nodes):
+            logging.warning(f"Invalid edge: {source_id} -> {target_id} (one or both nodes not found)")
+            continue
+
+        if source_id in planned_nodes[target_id].context:
+            logging.warning(f"Duplicate edge: {source_id} -> {target_id} (already connected)")
+            continue
+
+        if source_id == PROMPT_NODE_ID:
+            planned_nodes[target_id].receives_prompt = True
+        else:
+            try:
+                policy = parse_context_policy(edge.get('context'), default_policy)
+            except ValueError as e:
+                raise ValueError(f"Invalid context policy on edge {source_id} -> {target_id}: {e}")
+            planned_nodes[target_id].context.append(source_id)
+            if policy.mode != "full":
+                planned_nodes[target_id].context_policies[source_id] = policy
+            dependencies[target_id].append(source_id)
+
+    levels = topological_levels(dependencies)
+    entry_points = [node_id for node_id, deps in dependencies.items() if not deps]
+
+    return GraphPlan(
+        nodes=planned_nodes,
+        dependencies=dependencies,
+        levels=levels,
+        entry_points=entry_points
+    )
+
+
+class PlanCache:
+    """LRU of compiled plans keyed by saved system name and version"""
+
+    def __init__(self, max_entries=PLAN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compile(self, system, find_persona):
+        """
+        Return the plan of a saved system, compiling it on first use.
+
+        The cache key includes the system's updated_at, so editing the system
+        yields a new plan; editing one of its personas is detected by
+        GraphPlan.is_current and also triggers a recompile.
+        """
+        key = (system['name'], system.get('updated_at'))
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+
+        if plan is not None and plan.is_current(find_persona):
+            return plan
+
+        plan = compile_graph(system.get('graph', {}), find_persona)
+        logging.info(f"Compiled execution plan for system '{system['name']}'")
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+        return plan
@@ -0,0 +1,154 @@
+"""
+Dependency-aware scheduler for crew graphs.
+
+Runs every node as soon as all of its upstream nodes have finished, using a
+bounded thread pool, so independent branches of a graph execute concurrently
+instead of one after another. run_dag_async does the same with coroutines
+on an event loop.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+DEFAULT_MAX_PARALLELISM = int(os.environ.get("MAX_GRAPH_PARALLELISM", "4"))
+
+
+def resolve_max_parallelism(value=None):
+    """Validate a per-run parallelism setting, falling back to the default"""
+    if value is None or value == '':
+        return DEFAULT_MAX_PARALLELISM
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"max_parallelism must be a positive integer, got {value!r}")
+    if value < 1:
+        raise ValueError(f"max_parallelism must be a positive integer, got {value}")
+    return value
+
+
+def topological_levels(dependencies):
+    """
+    Group nodes into execution levels.
+
+    Args:
+        dependencies: dict mapping node id -> iterable of node ids it depends on.
+            Every dependency must itself be a key of the dict.
+
+    Returns:
+        list of lists of node ids; every node only depends on nodes in earlier levels.
+        Node order within a level follows the order of the input dict.
+
+    Raises:
+        ValueError: if the graph contains a cycle
+    """
+    remaining = {node: set(deps) for node, deps in dependencies.items()}
+    levels = []
+    done = set()
+    while remaining:
+        level = [node for node, deps in remaining.items() if deps <= done]
+        if not level:
+            cycle_nodes = ', '.join(remaining)
+            raise ValueError(f"Cannot run workflow: the graph contains a cycle between nodes ({cycle_nodes}).")
+        levels.append(level)
+        done.update(level)
+        for node in level:
+            del remaining[node]
+    return levels
+
+
+def run_dag(dependencies, run_node, max_workers=None):
+    """
+    Execute a dependency graph on a bounded worker pool.
+
+    A node is submitted as soon as all of its dependencies have completed, so
+    the overall latency approaches the critical path rather than the sum of
+    all node latencies.
+
+    Args:
+        dependencies: dict mapping node id -> iterable of node ids it depends on
+        run_node: callable taking a node id; called at most once per node
+        max_workers: maximum number of nodes running at the same time
+
+    Returns:
+        dict mapping node id -> return value of run_node
+
+    Raises:
+        ValueError: if the graph contains a cycle
+        Exception: the first exception raised by run_node; nodes that have not
+            started yet are cancelled
+    """
+    # Validates the graph up front so a cycle is reported before any work starts
+    topological_levels(dependencies)
+
+    max_workers = resolve_max_parallelism(max_workers)
+    waiting_on = {node: set(deps) for node, deps in dependencies.items()}
+    dependents = {node: [] for node in dependencies}
+    for node, deps in dependencies.items():
+        # A dependency listed twice (duplicated edge) must not unblock the node twice
+        for dep in dict.fromkeys(deps):
+            dependents[dep].append(node)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crew-node") as pool:
+        running = {}
+
+        def submit_ready(nodes):
+            for node in nodes:
+                if not waiting_on[node]:
+                    running[pool.submit(run_node, node)] = node
+
+        submit_ready(list(dependencies))
+
+        try:
+            while running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    node = running.pop(future)
+                    results[node] = future.result()
+                    unblocked = []
+                    for child in dependents[node]:
+                        waiting_on[child].discard(node)
+                        if not waiting_on[child]:
+                            unblocked.append(child)
+                    submit_ready(unblocked)
+        except BaseException:
+            for future in running:
+                future.cancel()
+            raise
+
+    return results
+
+
+async def run_dag_async(dependencies, run_node, max_concurrency=None):
+    """
+    Execute a dependency graph on the running event loop.
+
+    Same scheduling and error behaviour as run_dag, for a coroutine function
+    `run_node`; at most `max_concurrency` nodes are awaited at the same time.
+    """
+    levels = topological_levels(dependencies)
+
+    slots = asyncio.Semaphore(resolve_max_parallelism(max_concurrency))
+    node_tasks = {}
+
+    async def run(node):
+        if dependencies[node]:
+            await asyncio.gather(*(node_tasks[dep] for dep in dependencies[node]))
+        async with slots:
+            return await run_node(node)
+
+    # Levels order guarantees the tasks of a node's dependencies already exist
+    for level in levels:
+        for node in level:
+            node_tasks[node] = asyncio.ensure_future(run(node))
+
+    try:
+        await asyncio.gather(*node_tasks.values())
+    except BaseException:
+        for task in node_tasks.values():
+            task.cancel()
+        await asyncio.gather(*node_tasks.values(), return_exceptions=True)
+        raise
+
+    return {node: task.result() for node, task in node_tasks.items()}
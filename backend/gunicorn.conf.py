@@ -0,0 +1,49 @@
+"""
+Gunicorn settings for the backend (gunicorn -c gunicorn.conf.py wsgi:app).
+
+Graph runs spend most of their time waiting on the LLM API, so each worker
+process serves requests from a pool of threads. Every worker keeps its own
+background run pool; set RUNS_DIR to a directory shared by all workers so any
+of them can report on a run executed by another.
+
+On shutdown each worker stops accepting runs and waits up to
+RUN_SHUTDOWN_TIMEOUT seconds for its queued and running runs to finish.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get("BACKEND_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_WORKERS", min(multiprocessing.cpu_count() * 2 + 1, 4)))
+worker_class = "gthread"
+threads = int(os.environ.get("WEB_THREADS", "16"))
+
+# Synchronous runs (/api/run-crew-graph) and event streams hold a request for minutes
+timeout = int(os.environ.get("WEB_TIMEOUT", "600"))
+keepalive = 5
+
+RUN_SHUTDOWN_TIMEOUT = float(os.environ.get("RUN_SHUTDOWN_TIMEOUT", "120"))
+# Leave the workers time to drain their background runs before they are killed
+graceful_timeout = int(RUN_SHUTDOWN_TIMEOUT) + 10
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("LOG_LEVEL", "info").lower()
+
+# Background runs of a worker are not visible to the others without a shared directory
+if workers > 1:
+    raw_env = [f"RUNS_DIR={os.environ.get('RUNS_DIR') or 'runs'}"]
+    # Size-based rotation is per process, so every worker writes its own log file
+    if "LOG_FILE" not in os.environ:
+        raw_env.append(f"LOG_FILE={os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crew_run.{pid}.log')}")
+
+
+def worker_exit(server, worker):
+    """Drain background runs before a worker process exits"""
+    from app import run_manager
+
+    stats = run_manager.stats()
+    if stats["queued"] or stats["running"]:
+        worker.log.info(f"Waiting for {stats['queued']} queued and {stats['running']} running runs to finish")
+    if not run_manager.shutdown(timeout=RUN_SHUTDOWN_TIMEOUT):
+        worker.log.warning("Background runs still in progress at shutdown were abandoned")
@@ -0,0 +1,100 @@
+"""
+Cache of API key validation results.
+
+Validating a key costs an upstream models.list() call, which is slow and
+rate-limited, and the settings page validates the same key repeatedly. The
+outcome is cached under an HMAC of the key with a per-process random salt, so
+neither the key nor an unsalted hash of it is kept. Valid keys are remembered
+for KEY_VALIDATION_TTL seconds and rejected keys for the shorter
+KEY_VALIDATION_NEGATIVE_TTL; errors that say nothing about the key (network
+failures, rate limits) are not cached at all.
+
+Concurrent validations of the same key share a single upstream call.
+"""
+
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+
+KEY_VALIDATION_TTL = float(os.environ.get("KEY_VALIDATION_TTL", "300"))
+KEY_VALIDATION_NEGATIVE_TTL = float(os.environ.get("KEY_VALIDATION_NEGATIVE_TTL", "30"))
+KEY_VALIDATION_CACHE_SIZE = int(os.environ.get("KEY_VALIDATION_CACHE_SIZE", "1024"))
+
+
+class _Flight:
+    """An upstream validation in progress, awaited by concurrent callers"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.valid = None
+        self.error = None
+
+
+class KeyValidationCache:
+    """TTL cache of key validation outcomes with single-flight deduplication"""
+
+    def __init__(self, ttl=KEY_VALIDATION_TTL, negative_ttl=KEY_VALIDATION_NEGATIVE_TTL,
+                 max_entries=KEY_VALIDATION_CACHE_SIZE):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._salt = os.urandom(32)
+        self._results = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def _digest(self, api_key):
+        return hmac.new(self._salt, api_key.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def validate(self, api_key, check):
+        """
+        Return whether `api_key` is valid, calling `check(api_key)` on a miss.
+
+        Args:
+            check: callable returning True for a valid key and False for a
+                rejected one; any exception it raises is passed on to every
+                waiting caller and not cached
+
+        Returns:
+            bool
+        """
+        digest = self._digest(api_key)
+        with self._lock:
+            cached = self._results.get(digest)
+            if cached is not None:
+                expires_at, valid = cached
+                if time.monotonic() < expires_at:
+                    return valid
+                del self._results[digest]
+
+            flight = self._flights.get(digest)
+            leader = flight is None
+            if leader:
+                flight = self._flights[digest] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.valid
+
+        try:
+            flight.valid = bool(check(api_key))
+        except Exception as e:
+            flight.error = e
+            raise
+        else:
+            ttl = self.ttl if flight.valid else self.negative_ttl
+            with self._lock:
+                self._results[digest] = (time.monotonic() + ttl, flight.valid)
+                self._results.move_to_end(digest)
+                while len(self._results) > self.max_entries:
+                    self._results.popitem(last=False)
+            return flight.valid
+        finally:
+            with self._lock:
+                del self._flights[digest]
+            flight.done.set()
@@ -0,0 +1,104 @@
+"""
+Content-addressed cache of node outputs.
+
+A node's output is determined by the persona (role, goal, backstory, expected
+output), the resolved task description, the outputs of its upstream nodes and
+the model parameters, so a hash of those is used as the cache key. Entries
+live in an in-memory LRU with a TTL and, when LLM_CACHE_DIR is set, in an
+on-disk store shared by all worker processes.
+
+The cache is opt-in per run ("use_cache": true in the run request).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from storage import atomic_write
+
+LLM_CACHE_SIZE = int(os.environ.get("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_DIR = os.environ.get("LLM_CACHE_DIR") or None
+
+
+def node_cache_key(persona, description, context, llm_settings=None):
+    """Hash everything that determines a node's output into a cache key"""
+    payload = {
+        "agent": {
+            "role": persona['agent']['role'],
+            "goal": persona['agent']['goal'],
+            "backstory": persona['agent']['backstory']
+        },
+        "expected_output": persona['task']['expected_output'],
+        "description": description,
+        "context": context,
+        "model": llm_settings.model if llm_settings else None,
+        "base_url": llm_settings.base_url if llm_settings else None,
+        "temperature": llm_settings.temperature if llm_settings else None,
+        "provider": llm_settings.provider if llm_settings else None
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResponseCache:
+    """LRU + TTL cache of node outputs with an optional on-disk backend"""
+
+    def __init__(self, max_entries=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL, directory=LLM_CACHE_DIR):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory = directory
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def get(self, key):
+        """Return the cached output for `key`, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl:
+                    self._entries.move_to_end(key)
+                    return entry[1]
+                del self._entries[key]
+
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), 'r') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if now - stored['created_at'] > self.ttl:
+            return None
+
+        self._remember(key, stored['created_at'], stored['output'])
+        return stored['output']
+
+    def put(self, key, output):
+        """Store the output for `key` in memory and, if configured, on disk"""
+        created_at = time.time()
+        self._remember(key, created_at, output)
+        if self.directory:
+            path = self._path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                atomic_write(path, json.dumps({"created_at": created_at, "output": output}))
+            except OSError as e:
+                logging.warning(f"Could not write LLM cache entry {key}: {e}")
+
+    def _remember(self, key, created_at, output):
+        with self._lock:
+            self._entries[key] = (created_at, output)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -0,0 +1,355 @@
+"""
+Per-run LLM configuration.
+
+Each run builds its own LLM object from the caller's credentials and hands it
+to every agent explicitly, instead of setting openai.api_key or
+OPENAI_API_KEY process-wide. Concurrent requests from different users can then
+share one process without picking up each other's keys.
+
+Outbound HTTP connections are shared, though: OpenAI clients are pooled per
+credential and base URL, and all clients for a base URL use one keep-alive
+httpx connection pool (HTTP/2 when the h2 package is installed), so runs and
+key validations do not pay a new TCP/TLS handshake for every call.
+
+When a run asks for streaming, token deltas published by CrewAI's event bus
+are forwarded to the callback registered for the agent (or, for CrewAI
+versions whose events do not identify the agent, for the current thread).
+The start and end of every LLM call (including retried ones) and its token
+usage are reported the same way, for run traces and metrics.
+"""
+
+import hashlib
+import importlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Optional
+
+DEFAULT_MODEL = os.environ.get("OPENAI_MODEL_NAME", "gpt-4o-mini")
+DEFAULT_BASE_URL = os.environ.get("OPENAI_API_BASE") or None
+# "openai" (default) or "mock" for the deterministic offline LLM of mock_llm.py
+LLM_PROVIDER = os.environ.get("LLM_PROVIDER", "openai")
+
+LLM_CLIENT_POOL_SIZE = int(os.environ.get("LLM_CLIENT_POOL_SIZE", "64"))
+LLM_HTTP_MAX_CONNECTIONS = int(os.environ.get("LLM_HTTP_MAX_CONNECTIONS", "100"))
+LLM_HTTP_KEEPALIVE = float(os.environ.get("LLM_HTTP_KEEPALIVE", "60"))
+# Seconds to wait for CrewAI's event handlers at the end of a node (see flush_llm_events)
+LLM_EVENT_FLUSH_TIMEOUT = float(os.environ.get("LLM_EVENT_FLUSH_TIMEOUT", "5"))
+
+
+@dataclass(frozen=True)
+class LLMSettings:
+    """Credentials and model parameters for one run (the key is kept out of repr/logs)"""
+    api_key: str = field(repr=False)
+    model: str = DEFAULT_MODEL
+    base_url: Optional[str] = DEFAULT_BASE_URL
+    temperature: Optional[float] = None
+    stream: bool = False
+    provider: str = LLM_PROVIDER
+
+    def create_llm(self):
+        """Create a CrewAI LLM bound to these credentials"""
+        if self.provider == 'mock':
+            from mock_llm import create_mock_llm
+            return create_mock_llm(model=self.model, temperature=self.temperature)
+
+        from crewai import LLM
+
+        options = {
+            "model": self.model,
+            "api_key": self.api_key,
+            "base_url": self.base_url,
+            "temperature": self.temperature
+        }
+        if self.stream:
+            options["stream"] = True
+        llm = LLM(**options)
+        if _uses_openai_client(self.model):
+            client = self.create_openai_client()
+            if hasattr(llm, '_get_sync_client'):
+                # CrewAI's native OpenAI provider (1.x): its calls go through `_client`
+                llm._client = client
+            else:
+                # litellm passes the client through, and then reuses the pooled connections
+                llm = LLM(client=client, **options)
+        return llm
+
+    def create_openai_client(self):
+        """Return the pooled OpenAI SDK client bound to these credentials"""
+        return _get_openai_client(self.api_key, self.base_url)
+
+
+def _uses_openai_client(model):
+    """Whether `model` is called through the OpenAI SDK (no other provider prefix)"""
+    return '/' not in model or model.startswith('openai/')
+
+
+_http_clients = {}
+_openai_clients = OrderedDict()
+_clients_lock = threading.Lock()
+
+
+def _get_http_client(base_url):
+    """Return the shared keep-alive httpx client for a base URL (caller holds the lock)"""
+    client = _http_clients.get(base_url)
+    if client is None:
+        import httpx
+
+        try:
+            import h2  # noqa: F401
+            http2 = True
+        except ImportError:
+            http2 = False
+        client = httpx.Client(
+            http2=http2,
+            timeout=httpx.Timeout(600.0, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=LLM_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=LLM_HTTP_KEEPALIVE
+            )
+        )
+        _http_clients[base_url] = client
+        logging.info(f"Opened LLM connection pool for {base_url or 'the default endpoint'} (HTTP/2: {http2})")
+    return client
+
+
+def _get_openai_client(api_key, base_url):
+    """Return a pooled OpenAI client for a key and base URL, creating it on first use"""
+    import openai
+
+    # The pool is keyed by a hash so the key itself is not kept as a dict key
+    key = (hashlib.sha256(api_key.encode('utf-8')).hexdigest(), base_url)
+    with _clients_lock:
+        client = _openai_clients.get(key)
+        if client is None:
+            client = openai.OpenAI(api_key=api_key, base_url=base_url, http_client=_get_http_client(base_url))
+            _openai_clients[key] = client
+        _openai_clients.move_to_end(key)
+        # Evicted clients are not closed: they share the connection pool, and may still be in use
+        while len(_openai_clients) > LLM_CLIENT_POOL_SIZE:
+            _openai_clients.popitem(last=False)
+        return client
+
+
+def _import_crewai_events(*names):
+    """Return CrewAI's event bus and the named event classes, or None if unavailable"""
+    for module_name in ("crewai.events", "crewai.utilities.events"):
+        try:
+            module = importlib.import_module(module_name)
+            return module.crewai_event_bus, [getattr(module, name) for name in names]
+        except (ImportError, AttributeError):
+            continue
+    return None
+
+
+_chunk_callbacks = {}
+_chunk_callbacks_lock = threading.Lock()
+_thread_chunk_callback = threading.local()
+# None until the first streaming run, then whether CrewAI supports stream events
+_chunk_listener_installed = None
+
+
+def _install_chunk_listener():
+    """Subscribe once to CrewAI's LLM stream events; returns False if unsupported"""
+    global _chunk_listener_installed
+    with _chunk_callbacks_lock:
+        if _chunk_listener_installed is not None:
+            return _chunk_listener_installed
+        events = _import_crewai_events("LLMStreamChunkEvent")
+        if events is None:
+            logging.info("This CrewAI version does not publish LLM stream events; token deltas are disabled")
+            _chunk_listener_installed = False
+            return False
+        crewai_event_bus, (LLMStreamChunkEvent,) = events
+
+        @crewai_event_bus.on(LLMStreamChunkEvent)
+        def _forward_chunk(source, event):
+            agent_id = getattr(event, 'agent_id', None)
+            callback = _chunk_callbacks.get(str(agent_id)) if agent_id else None
+            if callback is None:
+                callback = getattr(_thread_chunk_callback, 'callback', None)
+            if callback is not None and event.chunk:
+                callback(event.chunk)
+
+        _chunk_listener_installed = True
+        return True
+
+
+@contextmanager
+def forward_llm_chunks(agent, callback, thread_fallback=True):
+    """
+    Send the streamed token deltas of `agent` to `callback` while the block runs.
+
+    With `thread_fallback`, deltas of events that do not identify their agent
+    also go to `callback` when published on the calling thread; pass False
+    when several agents share the thread (coroutines on one event loop).
+    """
+    if not _install_chunk_listener():
+        yield
+        return
+
+    agent_key = str(agent.id)
+    with _chunk_callbacks_lock:
+        _chunk_callbacks[agent_key] = callback
+    if thread_fallback:
+        _thread_chunk_callback.callback = callback
+    try:
+        yield
+    finally:
+        if thread_fallback:
+            _thread_chunk_callback.callback = None
+        with _chunk_callbacks_lock:
+            _chunk_callbacks.pop(agent_key, None)
+
+
+class _CallTracker:
+    """Pairs the start and end events of an agent's LLM calls and sums their usage"""
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.started = None
+        self.usage = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.started = time.perf_counter()
+
+    def finish(self, error=None):
+        if self.started is not None:
+            self.callback(self.started, time.perf_counter(), error)
+            self.started = None
+
+    def add_usage(self, usage):
+        """Count a completed call and the tokens reported by its provider"""
+        usage = usage or {}
+        with self._lock:
+            self.usage["requests"] += 1
+            self.usage["prompt_tokens"] += usage.get("prompt_tokens") or 0
+            self.usage["completion_tokens"] += usage.get("completion_tokens") or 0
+
+
+_call_trackers = {}
+_call_trackers_lock = threading.Lock()
+_thread_call_tracker = threading.local()
+# None until the first observed call, then whether CrewAI publishes LLM call events
+_call_listener_installed = None
+_event_bus = None
+
+
+def _install_call_listener():
+    """Subscribe once to CrewAI's LLM call events; returns False if unsupported"""
+    global _call_listener_installed, _event_bus
+    with _call_trackers_lock:
+        if _call_listener_installed is not None:
+            return _call_listener_installed
+        events = _import_crewai_events("LLMCallStartedEvent", "LLMCallCompletedEvent", "LLMCallFailedEvent")
+        if events is None:
+            logging.info("This CrewAI version does not publish LLM call events; traces show whole tasks only")
+            _call_listener_installed = False
+            return False
+        crewai_event_bus, (LLMCallStartedEvent, LLMCallCompletedEvent, LLMCallFailedEvent) = events
+        _event_bus = crewai_event_bus
+
+        def tracker_for(event):
+            agent_id = getattr(event, 'agent_id', None)
+            tracker = _call_trackers.get(str(agent_id)) if agent_id else None
+            return tracker or getattr(_thread_call_tracker, 'tracker', None)
+
+        @crewai_event_bus.on(LLMCallStartedEvent)
+        def _call_started(source, event):
+            tracker = tracker_for(event)
+            if tracker is not None:
+                tracker.start()
+
+        @crewai_event_bus.on(LLMCallCompletedEvent)
+        def _call_completed(source, event):
+            tracker = tracker_for(event)
+            if tracker is not None:
+                tracker.finish()
+                tracker.add_usage(getattr(event, 'usage', None))
+
+        @crewai_event_bus.on(LLMCallFailedEvent)
+        def _call_failed(source, event):
+            tracker = tracker_for(event)
+            if tracker is not None:
+                tracker.finish(str(getattr(event, 'error', '')) or "failed")
+
+        _call_listener_installed = True
+        return True
+
+
+@contextmanager
+def observe_llm_calls(agent, callback, thread_fallback=True):
+    """
+    Report every LLM call of `agent` while the block runs.
+
+    `callback(start, end, error)` receives perf_counter() times and, for
+    failed calls, the error message (None otherwise); a call following a
+    failed one is a retry. `thread_fallback` is as for forward_llm_chunks.
+
+    Yields:
+        dict with the "requests", "prompt_tokens" and "completion_tokens" of
+        the completed calls, filled in as their events arrive (None when this
+        CrewAI version does not publish LLM call events); call
+        flush_llm_events() before leaving the block to count them all
+    """
+    if not _install_call_listener():
+        yield None
+        return
+
+    agent_key = str(agent.id)
+    tracker = _CallTracker(callback)
+    with _call_trackers_lock:
+        _call_trackers[agent_key] = tracker
+    if thread_fallback:
+        _thread_call_tracker.tracker = tracker
+    try:
+        yield tracker.usage
+    finally:
+        if thread_fallback:
+            _thread_call_tracker.tracker = None
+        with _call_trackers_lock:
+            _call_trackers.pop(agent_key, None)
+
+
+def flush_llm_events(timeout=None):
+    """
+    Wait until CrewAI's handlers have seen the LLM call events published so far.
+
+    CrewAI 1.x runs event handlers on a thread pool, so the end of a call may
+    be reported after the task returns; older versions call them inline and
+    there is nothing to wait for.
+    """
+    flush = getattr(_event_bus, 'flush', None)
+    if flush is not None:
+        flush(timeout=LLM_EVENT_FLUSH_TIMEOUT if timeout is None else timeout)
+
+
+def agent_token_usage(agent):
+    """
+    Return the cumulative LLM usage recorded by CrewAI for an agent.
+
+    Only kept up to date by CrewAI versions before 1.x (and the mock LLM);
+    newer versions report usage with their LLM call events.
+
+    Returns:
+        dict with "requests", "prompt_tokens" and "completion_tokens", or None
+        when this CrewAI version does not track usage per agent
+    """
+    token_process = getattr(agent, '_token_process', None)
+    if token_process is None:
+        return None
+    try:
+        summary = token_process.get_summary()
+    except Exception:
+        return None
+    return {
+        "requests": summary.successful_requests,
+        "prompt_tokens": summary.prompt_tokens,
+        "completion_tokens": summary.completion_tokens
+    }
@@ -0,0 +1,99 @@
+"""
+Logging for the backend.
+
+Log records are put on an in-memory queue by the threads that emit them and
+written to the console and to a size-rotated log file by a single background
+thread, so request and run threads never wait on log I/O.
+
+Settings (environment variables):
+    LOG_LEVEL           minimum level logged (default INFO)
+    LOG_FILE            log file path, "{pid}" is replaced by the process id
+                        (default crew_run.log next to this module; empty for
+                        console only)
+    LOG_MAX_BYTES       size at which the log file is rotated (default 10 MB)
+    LOG_BACKUP_COUNT    rotated files kept (default 5)
+    LOG_PAYLOAD_LIMIT   characters of prompts and outputs included in log lines
+                        (default 500)
+    LOG_SAMPLE_RATE     fraction of runs whose per-node details are logged at
+                        INFO; the other runs log them at DEBUG (default 1.0)
+    AGENT_VERBOSE       CrewAI verbose output (full LLM transcripts on stdout)
+                        for runs that do not set "verbose" (default off)
+"""
+
+import atexit
+import logging
+import os
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.environ.get("LOG_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "crew_run.log"))
+LOG_MAX_BYTES = int(os.environ.get("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.environ.get("LOG_BACKUP_COUNT", "5"))
+LOG_PAYLOAD_LIMIT = int(os.environ.get("LOG_PAYLOAD_LIMIT", "500"))
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "1.0"))
+AGENT_VERBOSE = os.environ.get("AGENT_VERBOSE", "").lower() in ("1", "true", "yes", "on")
+
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+
+_listener = None
+
+
+def configure_logging(level=LOG_LEVEL, log_file=LOG_FILE, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT):
+    """
+    Route the root logger through a queue to a background writer thread.
+
+    Only the first call configures logging; later calls return the running
+    listener. The queue is flushed when the process exits.
+
+    Returns:
+        the QueueListener writing the records
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        log_file = log_file.replace("{pid}", str(os.getpid()))
+        directory = os.path.dirname(log_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Appends across restarts; old records are dropped by rotation, not truncation
+        handlers.append(RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
+
+
+def truncate_payload(text, limit=None):
+    """Shorten a prompt or output for a log line, noting its full length"""
+    limit = LOG_PAYLOAD_LIMIT if limit is None else limit
+    text = str(text)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text)} chars]"
+
+
+def detail_level(verbose=False, sample_rate=None):
+    """
+    Level of a run's per-node log lines (prompts, context summaries, outputs)
+
+    Verbose runs and a LOG_SAMPLE_RATE fraction of the others log them at
+    INFO; the rest at DEBUG, so they are dropped at the default level.
+    """
+    sample_rate = LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+    if verbose or random.random() < sample_rate:
+        return logging.INFO
+    return logging.DEBUG
@@ -0,0 +1,219 @@
+"""
+Process metrics in the Prometheus text exposition format.
+
+A minimal, dependency-free registry of counters, gauges and histograms, served
+by the /metrics endpoint. All metrics are kept in memory per process: under
+gunicorn with several workers, each scrape reports the worker that answered
+it (add a per-worker scrape target, or run one worker per container, to see
+them all).
+
+The backend's metrics are defined at the bottom of this module.
+"""
+
+import math
+import threading
+
+# Seconds, from fast API calls up to long multi-node runs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base of the metric types: a name, help text and label names"""
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        """Return the metric's lines of the text exposition format"""
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(values.items())]
+
+
+class Counter(_Metric):
+    """A value that only goes up"""
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only be incremented")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """A value that goes up and down, or is read from `function` at scrape time"""
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        if self.function is not None:
+            return self.function()
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        if self.function is None:
+            return super()._samples()
+        return [f"{self.name} {_format_value(self.function())}"]
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum and count"""
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    def count(self, **labels):
+        with self._lock:
+            series = self._values.get(self._key(labels))
+            return series["count"] if series else 0
+
+    def _samples(self):
+        with self._lock:
+            values = {key: {"counts": list(series["counts"]), "sum": series["sum"], "count": series["count"]}
+                      for key, series in self._values.items()}
+        lines = []
+        for key, series in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series["counts"]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key, [("le", "+Inf")])
+            lines.append(f"{self.name}_bucket{labels} {series['count']}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """The metrics of the process, rendered together for /metrics"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), function=None):
+        return self._register(Gauge(name, documentation, labelnames, function=function))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets=buckets))
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Content type of the text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.counter(
+    "crew_http_requests_total", "HTTP requests by route and status", ["method", "endpoint", "status"])
+HTTP_REQUEST_DURATION = registry.histogram(
+    "crew_http_request_duration_seconds", "Time to produce an HTTP response (streamed bodies excluded)",
+    ["method", "endpoint"])
+HTTP_IN_FLIGHT = registry.gauge("crew_http_requests_in_flight", "HTTP requests being handled")
+
+RUN_DURATION = registry.histogram(
+    "crew_run_duration_seconds", "Duration of graph runs by system and outcome", ["system", "status"])
+NODE_DURATION = registry.histogram(
+    "crew_node_duration_seconds", "Duration of graph nodes by persona and outcome "
+    "(completed, cached, reused, failed)", ["persona", "outcome"])
+
+LLM_REQUESTS = registry.counter("crew_llm_requests_total", "LLM calls made by graph nodes", ["model"])
+LLM_TOKENS = registry.counter(
+    "crew_llm_tokens_total", "Tokens used by graph nodes by kind (prompt, completion)", ["model", "kind"])
+
+CONTEXT_TOKENS = registry.counter(
+    "crew_context_tokens_total", "Tokens of upstream outputs received by nodes, before (raw) and after (sent) "
+    "their edges' context policies", ["persona", "kind"])
+
+ERRORS = registry.counter("crew_errors_total", "Failed nodes and runs by exception type", ["stage", "type"])
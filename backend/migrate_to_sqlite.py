@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Import personas.json, systems.json and example_systems.json into the SQLite storage backend
+
+Usage:
+    python migrate_to_sqlite.py [--db triage.db]
+
+Existing records with the same name are left untouched, so the script can be
+run repeatedly. Start the backend with STORAGE_BACKEND=sqlite afterwards.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from storage import SqliteRecordStore, SQLITE_DB_PATH
+
+def import_file(store, path):
+    """Insert every record of a JSON list file into the store"""
+    if not os.path.exists(path):
+        print(f"⚠ {path} not found, skipping")
+        return
+
+    with open(path, 'r') as f:
+        records = json.load(f)
+
+    imported = 0
+    for record in records:
+        if 'name' not in record:
+            print(f"  ⚠ Skipping record without a name in {path}")
+            continue
+        if store.insert(record):
+            imported += 1
+        else:
+            print(f"  ⚠ Already exists: {record['name']}")
+
+    print(f"✅ Imported {imported} of {len(records)} records from {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate JSON data files to SQLite")
+    parser.add_argument('--db', default=SQLITE_DB_PATH, help="SQLite database file (default: %(default)s)")
+    parser.add_argument('--personas', default='personas.json')
+    parser.add_argument('--systems', default='systems.json')
+    parser.add_argument('--examples', default='example_systems.json')
+    args = parser.parse_args()
+
+    print(f"Migrating data into {args.db}...")
+    try:
+        import_file(SqliteRecordStore(args.db, 'personas'), args.personas)
+        systems = SqliteRecordStore(args.db, 'systems')
+        import_file(systems, args.systems)
+        import_file(systems, args.examples)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    print("\nMigration complete! Start the backend with STORAGE_BACKEND=sqlite to use it.")
+
+if __name__ == "__main__":
+    main()
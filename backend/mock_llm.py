@@ -0,0 +1,177 @@
+"""
+Deterministic stand-in for the LLM, for load tests and benchmarks.
+
+Selected with LLM_PROVIDER=mock. No network or API key is needed: every call
+waits for a latency drawn from MOCK_LLM_LATENCY and answers with
+MOCK_LLM_TOKENS words of filler text. Both are derived from a hash of the
+prompt and MOCK_LLM_SEED, so the same graph and prompt always produce the same
+outputs and timings, and runs can be compared across machines.
+
+MOCK_LLM_LATENCY is a number of seconds or a distribution:
+    fixed:<seconds>, uniform:<min>:<max>, normal:<mean>:<stddev>,
+    lognormal:<median>:<sigma>
+"""
+
+import asyncio
+import hashlib
+import math
+import os
+import random
+import threading
+import time
+
+MOCK_LLM_LATENCY = os.environ.get("MOCK_LLM_LATENCY", "fixed:0.5")
+MOCK_LLM_TOKENS = int(os.environ.get("MOCK_LLM_TOKENS", "200"))
+MOCK_LLM_SEED = os.environ.get("MOCK_LLM_SEED", "0")
+
+_WORDS = (
+    "resident county office request service road water permit tax record "
+    "department schedule update review support contact meeting board public "
+    "notice local question answer issue process form fee payment clerk"
+).split()
+
+
+def parse_latency(spec):
+    """
+    Parse a latency specification into a function of a random.Random.
+
+    Raises:
+        ValueError: for unknown distributions or malformed parameters
+    """
+    name, _, params = str(spec).partition(':')
+    try:
+        if not params:
+            seconds = float(name)
+            return lambda rng: seconds
+        values = [float(value) for value in params.split(':')]
+        if name == 'fixed' and len(values) == 1:
+            return lambda rng: values[0]
+        if name == 'uniform' and len(values) == 2:
+            return lambda rng: rng.uniform(values[0], values[1])
+        if name == 'normal' and len(values) == 2:
+            return lambda rng: max(rng.gauss(values[0], values[1]), 0.0)
+        if name == 'lognormal' and len(values) == 2:
+            return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid MOCK_LLM_LATENCY {spec!r}, expected seconds or fixed:/uniform:/normal:/lognormal: parameters")
+
+
+class MockResponder:
+    """Produces the deterministic latency, text and token counts of mock calls"""
+
+    def __init__(self, latency=MOCK_LLM_LATENCY, tokens=MOCK_LLM_TOKENS, seed=MOCK_LLM_SEED):
+        self.latency = parse_latency(latency)
+        self.tokens = tokens
+        self.seed = str(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def respond(self, prompt):
+        """Return (latency in seconds, answer text) for a prompt and count the call"""
+        digest = hashlib.sha256(f"{self.seed}\n{prompt}".encode('utf-8')).digest()
+        rng = random.Random(digest)
+        latency = self.latency(rng)
+        words = [rng.choice(_WORDS) for _ in range(self.tokens)]
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += len(prompt.split())
+            self.completion_tokens += self.tokens
+        return latency, f"[mock {digest.hex()[:8]}] " + ' '.join(words)
+
+    def usage(self):
+        """Return call and token counters"""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens
+            }
+
+
+def _prompt_text(messages):
+    """Flatten a string or a list of chat messages into one prompt string"""
+    if isinstance(messages, str):
+        return messages
+    return '\n'.join(f"{message.get('role', '')}: {message.get('content', '')}" for message in messages)
+
+
+def _format_answer(text):
+    """Wrap an answer the way CrewAI's agent executor expects a final answer"""
+    return f"Thought: I now know the final answer\nFinal Answer: {text}"
+
+
+def _report_usage(callbacks, prompt, completion_tokens):
+    """Add a call's token counts to the agent's usage, as CrewAI's token callback would"""
+    for callback in callbacks or []:
+        token_process = getattr(callback, 'token_cost_process', None)
+        if token_process is not None:
+            token_process.sum_prompt_tokens(len(prompt.split()))
+            token_process.sum_completion_tokens(completion_tokens)
+            token_process.sum_successful_requests(1)
+
+
+_mock_llm_class = None
+
+
+def _get_mock_llm_class():
+    """Build the CrewAI LLM subclass once (BaseLLM on CrewAI versions that have it)"""
+    global _mock_llm_class
+    if _mock_llm_class is not None:
+        return _mock_llm_class
+
+    try:
+        from crewai import BaseLLM as Base
+    except ImportError:
+        from crewai import LLM as Base
+
+    class MockLLM(Base):
+        """CrewAI LLM answering from a MockResponder instead of a model API"""
+
+        def __init__(self, responder, model="mock", temperature=None):
+            super().__init__(model=model, temperature=temperature)
+            self.responder = responder
+
+        def call(self, messages, *args, **kwargs):
+            prompt = _prompt_text(messages)
+            latency, text = self.responder.respond(prompt)
+            time.sleep(latency)
+            _report_usage(kwargs.get('callbacks'), prompt, self.responder.tokens)
+            return _format_answer(text)
+
+        async def acall(self, messages, *args, **kwargs):
+            prompt = _prompt_text(messages)
+            latency, text = self.responder.respond(prompt)
+            await asyncio.sleep(latency)
+            _report_usage(kwargs.get('callbacks'), prompt, self.responder.tokens)
+            return _format_answer(text)
+
+        def supports_function_calling(self):
+            return False
+
+        def supports_stop_words(self):
+            return False
+
+        def get_context_window_size(self):
+            return 128000
+
+    _mock_llm_class = MockLLM
+    return MockLLM
+
+
+# Shared by every mock LLM of the process so usage() covers all runs
+default_responder = None
+_default_responder_lock = threading.Lock()
+
+
+def create_mock_llm(model="mock", temperature=None, responder=None):
+    """Create a CrewAI LLM backed by the (process-wide by default) MockResponder"""
+    global default_responder
+    if responder is None:
+        with _default_responder_lock:
+            if default_responder is None:
+                default_responder = MockResponder()
+            responder = default_responder
+    return _get_mock_llm_class()(responder, model=model, temperature=temperature)
@@ -0,0 +1,394 @@
+"""
+Background execution of graph runs.
+
+A submitted run gets an id immediately and is executed by a bounded pool of
+background workers; clients poll its record for status, per-node progress
+and the final result. The number of queued runs is capped so overload is
+reported to the caller (QueueFullError) instead of piling up unbounded work.
+
+Every progress event of a run is also appended to a per-run event log with a
+sequence number, which wait_for_events() serves to streaming clients (SSE),
+including ones that reconnect and resume from the last event they saw.
+A "run_trace" event is not logged: its timing spans are kept aside and served
+by get_trace().
+
+When RUNS_DIR is set, every run record and its event log are also written to
+that directory, so that with several worker processes (see gunicorn.conf.py)
+any of them can serve the status, events and previous_run_id of a run executed
+by another. Token delta events are written at most every RUN_SYNC_INTERVAL
+seconds; all other events are written immediately.
+
+With RUN_EXECUTOR=async, runs are coroutines on one background event loop
+instead of each occupying a worker thread, and up to RUN_ASYNC_LIMIT of them
+execute at the same time.
+"""
+
+import asyncio
+import copy
+import datetime
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from storage import atomic_write
+
+RUN_WORKERS = int(os.environ.get("RUN_WORKERS", "4"))
+RUN_QUEUE_LIMIT = int(os.environ.get("RUN_QUEUE_LIMIT", "32"))
+RUN_HISTORY_LIMIT = int(os.environ.get("RUN_HISTORY_LIMIT", "200"))
+RUNS_DIR = os.environ.get("RUNS_DIR") or None
+RUN_SYNC_INTERVAL = float(os.environ.get("RUN_SYNC_INTERVAL", "0.5"))
+RUN_EXECUTOR = os.environ.get("RUN_EXECUTOR", "thread")
+RUN_ASYNC_LIMIT = int(os.environ.get("RUN_ASYNC_LIMIT", "256"))
+
+RUN_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+class QueueFullError(Exception):
+    """Raised when no more runs can be queued"""
+
+
+def _now():
+    return datetime.datetime.now().isoformat()
+
+
+class BackgroundLoop:
+    """An asyncio event loop running in a daemon thread"""
+
+    def __init__(self, name="run-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, coroutine):
+        """Schedule a coroutine on the loop; returns a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+class RunManager:
+    """
+    Executes runs on background workers and keeps their status records
+
+    With executor="thread" a job is a callable returning the run result and
+    runs on one of `max_workers` threads; with executor="async" a job returns
+    an awaitable, awaited on the manager's event loop with at most
+    `max_concurrent` runs in progress.
+    """
+
+    def __init__(self, max_workers=RUN_WORKERS, max_queued=RUN_QUEUE_LIMIT, history_limit=RUN_HISTORY_LIMIT,
+                 directory=RUNS_DIR, executor=RUN_EXECUTOR, max_concurrent=RUN_ASYNC_LIMIT):
+        if executor not in ("thread", "async"):
+            raise ValueError(f"Unknown run executor {executor!r}, expected 'thread' or 'async'")
+        self.max_queued = max_queued
+        self.history_limit = history_limit
+        self.directory = directory
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.is_async = executor == "async"
+        if self.is_async:
+            self._loop = BackgroundLoop()
+            self._slots = asyncio.Semaphore(max_concurrent)
+            self._executor = None
+        else:
+            self._loop = None
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crew-run")
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._runs = OrderedDict()
+        self._events = {}
+        self._traces = {}
+        self._queued = 0
+        self._synced_at = {}
+        self._closed = False
+
+    def submit(self, job):
+        """
+        Queue a run.
+
+        Args:
+            job: callable taking a `listener` keyword argument (called with
+                progress event dicts) and returning the run result
+
+        Returns:
+            snapshot of the new run record
+
+        Raises:
+            QueueFullError: if RUN_QUEUE_LIMIT runs are already waiting, or
+                the manager is shutting down
+        """
+        with self._lock:
+            if self._closed:
+                raise QueueFullError("The server is shutting down, please retry later")
+            if self._queued >= self.max_queued:
+                raise QueueFullError(f"Too many queued runs ({self._queued}), please retry later")
+            self._queued += 1
+            run_id = self._create()
+            snapshot = copy.deepcopy(self._runs[run_id])
+
+        if self.is_async:
+            self._loop.submit(self._execute_async(run_id, job))
+        else:
+            self._executor.submit(self._execute, run_id, job)
+        return snapshot
+
+    def run(self, job):
+        """
+        Execute a run and wait for it in the calling thread, recording it like
+        a background run (async jobs still run on the manager's event loop).
+
+        Returns:
+            snapshot of the finished run record
+
+        Raises:
+            the exception raised by `job`, after recording the run as failed
+        """
+        with self._lock:
+            self._queued += 1
+            run_id = self._create()
+        if self.is_async:
+            error = self._loop.submit(self._execute_async(run_id, job)).result()
+        else:
+            error = self._execute(run_id, job)
+        if error is not None:
+            raise error
+        return self.get(run_id)
+
+    def _create(self):
+        """Add a new queued run record and return its id (caller holds the lock)"""
+        run_id = uuid.uuid4().hex
+        self._runs[run_id] = {
+            "run_id": run_id,
+            "status": "queued",
+            "created_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+            "nodes": {},
+            "result": None,
+            "error": None
+        }
+        self._events[run_id] = []
+        self._append_event(run_id, {"type": "run_queued"})
+        self._evict()
+        return run_id
+
+    def get(self, run_id):
+        """Return a snapshot of a run record, or None if unknown or expired"""
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run:
+                return copy.deepcopy(run)
+        stored = self._load(run_id)
+        return stored["run"] if stored else None
+
+    def get_trace(self, run_id):
+        """Return the timing spans reported by a run, or None if unknown or not reported yet"""
+        with self._lock:
+            if run_id in self._runs:
+                return copy.deepcopy(self._traces.get(run_id))
+        stored = self._load(run_id)
+        return stored.get("trace") if stored else None
+
+    def wait_for_events(self, run_id, after=-1, timeout=15):
+        """
+        Return the events of a run with a sequence number greater than `after`,
+        waiting up to `timeout` seconds for new ones.
+
+        Returns:
+            (events, finished) or None if the run is unknown or expired.
+            `finished` is True once the run has ended and no later events will follow.
+        """
+        with self._changed:
+            if run_id in self._runs:
+                self._changed.wait_for(
+                    lambda: run_id not in self._runs
+                    or len(self._events[run_id]) > after + 1
+                    or self._runs[run_id]["finished_at"] is not None,
+                    timeout=timeout
+                )
+                if run_id in self._runs:
+                    events = self._events[run_id][after + 1:]
+                    return events, self._runs[run_id]["finished_at"] is not None
+
+        # Executed by another process (or evicted here): follow its stored copy
+        deadline = time.monotonic() + timeout
+        while True:
+            stored = self._load(run_id)
+            if stored is None:
+                return None
+            events = stored["events"][after + 1:]
+            finished = stored["run"]["finished_at"] is not None
+            if events or finished or time.monotonic() >= deadline:
+                return events, finished
+            time.sleep(min(RUN_SYNC_INTERVAL, max(deadline - time.monotonic(), 0)))
+
+    def stats(self):
+        """Return counts of queued and running runs"""
+        with self._lock:
+            running = sum(1 for run in self._runs.values() if run["status"] == "running")
+            return {"queued": self._queued, "running": running}
+
+    def shutdown(self, timeout=None):
+        """
+        Stop accepting runs and wait for the queued and running ones to finish.
+
+        Returns:
+            True if all runs finished within `timeout` seconds
+        """
+        with self._changed:
+            self._closed = True
+            finished = self._changed.wait_for(
+                lambda: all(run["finished_at"] is not None for run in self._runs.values()),
+                timeout=timeout
+            )
+        if self.is_async:
+            self._loop.stop()
+        else:
+            self._executor.shutdown(wait=False)
+        return finished
+
+    def _execute(self, run_id, job):
+        """Run a job and record its outcome; returns the exception it raised, if any"""
+        self._start(run_id)
+        try:
+            result = job(listener=lambda event: self._on_event(run_id, event))
+        except Exception as e:
+            return self._fail(run_id, e)
+        self._succeed(run_id, result)
+        return None
+
+    async def _execute_async(self, run_id, job):
+        """Await an async job and record its outcome; returns the exception it raised, if any"""
+        async with self._slots:
+            self._start(run_id)
+            try:
+                result = await job(listener=lambda event: self._on_event(run_id, event))
+            except Exception as e:
+                return self._fail(run_id, e)
+            self._succeed(run_id, result)
+            return None
+
+    def _start(self, run_id):
+        with self._lock:
+            self._queued -= 1
+            run = self._runs[run_id]
+            run["status"] = "running"
+            run["started_at"] = _now()
+            self._append_event(run_id, {"type": "run_started"})
+
+    def _fail(self, run_id, error):
+        logging.error(f"Run {run_id} failed: {type(error).__name__}: {error}")
+        with self._lock:
+            run = self._runs[run_id]
+            run["status"] = "failed"
+            run["error"] = {"error": str(error), "type": type(error).__name__}
+            run["finished_at"] = _now()
+            self._append_event(run_id, {"type": "run_failed", "error": run["error"]})
+        return error
+
+    def _succeed(self, run_id, result):
+        with self._lock:
+            run = self._runs[run_id]
+            run["status"] = "succeeded"
+            run["result"] = result
+            run["finished_at"] = _now()
+            self._append_event(run_id, {"type": "run_succeeded", "result": result})
+
+    def _append_event(self, run_id, event):
+        """Add an event to a run's log and wake up waiting streams (caller holds the lock)"""
+        events = self._events[run_id]
+        events.append(dict(event, seq=len(events)))
+        self._changed.notify_all()
+        self._sync(run_id, force=event.get("type") != "node_chunk")
+
+    def _path(self, run_id):
+        return os.path.join(self.directory, run_id + '.json')
+
+    def _sync(self, run_id, force=True):
+        """Write a run and its events to RUNS_DIR, if configured (caller holds the lock)"""
+        if not self.directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._synced_at.get(run_id, 0) < RUN_SYNC_INTERVAL:
+            return
+        self._synced_at[run_id] = now
+        try:
+            atomic_write(self._path(run_id), json.dumps({
+                "run": self._runs[run_id],
+                "events": self._events[run_id],
+                "trace": self._traces.get(run_id)
+            }))
+        except (OSError, TypeError, ValueError) as e:
+            logging.warning(f"Could not store run {run_id}: {e}")
+
+    def _load(self, run_id):
+        """Read a run stored by any process, or None"""
+        if not self.directory or not RUN_ID_PATTERN.match(run_id):
+            return None
+        try:
+            with open(self._path(run_id), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _on_event(self, run_id, event):
+        """Apply a progress event emitted by execute_crew_graph to the run record"""
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is None:
+                return
+            if event.get("type") == "run_trace":
+                # Stored with the run's final event, which follows
+                self._traces[run_id] = event["spans"]
+                return
+            self._apply_event(run, event)
+            self._append_event(run_id, event)
+
+    def _apply_event(self, run, event):
+        """Update the status of a run's nodes from a progress event (caller holds the lock)"""
+        event_type = event.get("type")
+        if event_type == "run_planned":
+            run["nodes"] = {
+                node_id: dict(info, status="pending")
+                for node_id, info in event["nodes"].items()
+            }
+            return
+        if "node" not in event:
+            return
+
+        node = run["nodes"].setdefault(event["node"], {})
+        if event_type == "node_started":
+            node.update(status="running", started_at=_now())
+        elif event_type == "node_completed":
+            node.update(
+                status="completed",
+                finished_at=_now(),
+                output=event.get("output"),
+                fingerprint=event.get("fingerprint")
+            )
+        elif event_type == "node_failed":
+            node.update(status="failed", finished_at=_now(), error=event.get("error"))
+
+    def _evict(self):
+        """Drop the oldest finished runs beyond the history limit (caller holds the lock)"""
+        excess = len(self._runs) - self.history_limit
+        if excess <= 0:
+            return
+        for run_id in [rid for rid, run in self._runs.items() if run["finished_at"]][:excess]:
+            del self._runs[run_id]
+            del self._events[run_id]
+            self._traces.pop(run_id, None)
+            self._synced_at.pop(run_id, None)
+            if self.directory:
+                try:
+                    os.remove(self._path(run_id))
+                except OSError:
+                    pass
+        self._changed.notify_all()
@@ -0,0 +1,374 @@
+"""
+Storage backends for personas and saved systems.
+
+Both collections are lists of JSON records identified by their "name". Two
+interchangeable backends implement the RecordStore interface:
+
+- JsonRecordStore (default): the personas.json / systems.json files.
+- SqliteRecordStore: one table per collection in a SQLite database (WAL mode,
+  unique index on name, transactional single-row updates).
+
+Select the backend with STORAGE_BACKEND=json|sqlite (and SQLITE_DB_PATH for
+the database file); migrate_to_sqlite.py imports the existing JSON files.
+
+JSON backend: records are kept in memory in a name-keyed dict so lookups are
+O(1). The backing file is only parsed again when it changes on disk (for
+example when it is edited by hand, by init_data.py or by another worker
+process).
+
+Each record's serialized JSON is cached as well, so a write only re-encodes
+the record that changed and the file is assembled from the cached fragments.
+The output is byte-for-byte what json.dump(records, f, indent=4) produces.
+
+Writes hold an exclusive lock on "<file>.lock" (shared by all processes),
+re-read the file if another process changed it, and replace it atomically
+through a temporary file and rename. Readers never take the lock and always
+see a complete file.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "json").lower()
+SQLITE_DB_PATH = os.environ.get("SQLITE_DB_PATH", "triage.db")
+
+
+class RecordExistsError(ValueError):
+    """Raised when a record would be renamed onto a name that is already taken"""
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive inter-process lock on `path` (created if missing)"""
+    with open(path, 'a+') as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def atomic_write(path, text):
+    """
+    Write `text` to `path` via a temporary file and rename, so readers see
+    either the old or the new content but never a partially written file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class RecordStore:
+    """Interface shared by the storage backends"""
+
+    def all(self):
+        """Return all records in insertion order (callers must not mutate them)"""
+        raise NotImplementedError
+
+    def to_json(self):
+        """Return the whole collection as a JSON array"""
+        return json.dumps(self.all())
+
+    def get(self, name):
+        """Return the record with the given name, or None"""
+        raise NotImplementedError
+
+    def insert(self, record):
+        """Append a new record. Returns False if the name is already taken."""
+        raise NotImplementedError
+
+    def replace(self, name, record):
+        """
+        Replace the record called `name` (it may be renamed).
+
+        Returns False if not found; raises RecordExistsError if the new name is taken.
+        """
+        raise NotImplementedError
+
+    def delete(self, name):
+        """Remove and return the record called `name`, or None if not found"""
+        raise NotImplementedError
+
+    def save_all(self, records):
+        """Replace the whole collection"""
+        raise NotImplementedError
+
+
+class JsonRecordStore(RecordStore):
+    """In-memory, name-indexed view of a JSON file containing a list of records"""
+
+    def __init__(self, path, key='name'):
+        self.path = path
+        self.key = key
+        self.lock_path = path + '.lock'
+        # (file signature, name -> record, name -> encoded fragment), swapped as a whole
+        self._state = (None, {}, {})
+        self._reload_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def _file_signature(self):
+        """Return (inode, mtime, size) of the backing file, or None if it does not exist"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _read_file(self):
+        records = {}
+        with open(self.path, 'r') as f:
+            for record in json.load(f):
+                name = record.get(self.key)
+                if name in records:
+                    logging.warning(f"Duplicate record '{name}' in {self.path}, keeping the first one")
+                    continue
+                records[name] = record
+        return records
+
+    def _current(self):
+        """Return the current (records, encoded) pair, reloading the file if it changed"""
+        signature = self._file_signature()
+        state = self._state
+        if signature != state[0]:
+            with self._reload_lock:
+                state = self._state
+                if signature != state[0]:
+                    records = self._read_file() if signature is not None else {}
+                    state = (signature, records, {})
+                    self._state = state
+                    logging.info(f"Loaded {len(records)} records from {self.path}")
+        return state[1], state[2]
+
+    def _fragment(self, records, encoded, name):
+        """Return the cached JSON text of a record, indented as a list item"""
+        fragment = encoded.get(name)
+        if fragment is None:
+            text = json.dumps(records[name], indent=4)
+            fragment = "    " + text.replace("\n", "\n    ")
+            encoded[name] = fragment
+        return fragment
+
+    def _serialize(self, records, encoded):
+        if not records:
+            return "[]"
+        return "[\n" + ",\n".join(self._fragment(records, encoded, name) for name in records) + "\n]"
+
+    @contextmanager
+    def _exclusive(self):
+        """Serialize writers across threads and processes; readers are never blocked"""
+        with self._write_lock, file_lock(self.lock_path):
+            yield
+
+    def _commit(self, records, encoded):
+        """Atomically replace the backing file and publish the new in-memory state"""
+        atomic_write(self.path, self._serialize(records, encoded))
+        self._state = (self._file_signature(), records, encoded)
+
+    def all(self):
+        """Return all records in file order (callers must not mutate them)"""
+        records, _ = self._current()
+        return list(records.values())
+
+    def to_json(self):
+        """Return the whole collection as a JSON array, reusing cached fragments"""
+        return self._serialize(*self._current())
+
+    def get(self, name):
+        """Return the record with the given name, or None"""
+        records, _ = self._current()
+        return records.get(name)
+
+    def insert(self, record):
+        """Append a new record. Returns False if the name is already taken."""
+        with self._exclusive():
+            records, encoded = self._current()
+            name = record[self.key]
+            if name in records:
+                return False
+            records = dict(records)
+            records[name] = record
+            self._commit(records, dict(encoded))
+            return True
+
+    def replace(self, name, record):
+        """
+        Replace the record called `name` (it may be renamed).
+
+        Returns False if not found; raises RecordExistsError if the new name is taken.
+        """
+        with self._exclusive():
+            records, encoded = self._current()
+            if name not in records:
+                return False
+            new_name = record.get(self.key, name)
+            if new_name != name and new_name in records:
+                raise RecordExistsError(f"A record named '{new_name}' already exists")
+            encoded = dict(encoded)
+            encoded.pop(name, None)
+            # Rebuilt rather than updated in place so a rename keeps the record's position
+            records = {
+                (new_name if key == name else key): (record if key == name else value)
+                for key, value in records.items()
+            }
+            self._commit(records, encoded)
+            return True
+
+    def delete(self, name):
+        """Remove and return the record called `name`, or None if not found"""
+        with self._exclusive():
+            records, encoded = self._current()
+            if name not in records:
+                return None
+            records = dict(records)
+            encoded = dict(encoded)
+            record = records.pop(name)
+            encoded.pop(name, None)
+            self._commit(records, encoded)
+            return record
+
+    def save_all(self, records):
+        """Replace the whole collection"""
+        with self._exclusive():
+            by_name = {}
+            for record in records:
+                by_name.setdefault(record.get(self.key), record)
+            self._commit(by_name, {})
+
+
+class SqliteRecordStore(RecordStore):
+    """Records stored as JSON documents in a SQLite table, one row per record"""
+
+    def __init__(self, db_path, table, key='name'):
+        self.db_path = db_path
+        self.table = table
+        self.key = key
+        self._local = threading.local()
+        with self._transaction() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "name TEXT NOT NULL UNIQUE, "
+                "data TEXT NOT NULL)"
+            )
+
+    def _connection(self):
+        """Return this thread's connection (autocommit), opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    def all(self):
+        rows = self._connection().execute(f"SELECT data FROM {self.table} ORDER BY id").fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def to_json(self):
+        # Stored documents are already JSON, so the list is assembled without decoding them
+        rows = self._connection().execute(f"SELECT data FROM {self.table} ORDER BY id").fetchall()
+        return "[" + ", ".join(data for (data,) in rows) + "]"
+
+    def get(self, name):
+        row = self._connection().execute(
+            f"SELECT data FROM {self.table} WHERE name = ?", (name,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def insert(self, record):
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                f"INSERT OR IGNORE INTO {self.table} (name, data) VALUES (?, ?)",
+                (record[self.key], json.dumps(record))
+            )
+        return cursor.rowcount == 1
+
+    def replace(self, name, record):
+        new_name = record.get(self.key, name)
+        try:
+            with self._transaction() as conn:
+                cursor = conn.execute(
+                    f"UPDATE {self.table} SET name = ?, data = ? WHERE name = ?",
+                    (new_name, json.dumps(record), name)
+                )
+        except sqlite3.IntegrityError:
+            raise RecordExistsError(f"A record named '{new_name}' already exists")
+        return cursor.rowcount == 1
+
+    def delete(self, name):
+        with self._transaction() as conn:
+            row = conn.execute(f"SELECT data FROM {self.table} WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                return None
+            conn.execute(f"DELETE FROM {self.table} WHERE name = ?", (name,))
+        return json.loads(row[0])
+
+    def save_all(self, records):
+        with self._transaction() as conn:
+            conn.execute(f"DELETE FROM {self.table}")
+            conn.executemany(
+                f"INSERT OR IGNORE INTO {self.table} (name, data) VALUES (?, ?)",
+                [(record.get(self.key), json.dumps(record)) for record in records]
+            )
+
+
+class _Transaction:
+    """Context manager running a block in a write-locked SQLite transaction"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        # IMMEDIATE takes the write lock up front so read-modify-write blocks are atomic
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def open_record_store(table, json_path, backend=None):
+    """Create the store for a collection using the configured backend"""
+    backend = (backend or STORAGE_BACKEND).lower()
+    if backend == 'json':
+        return JsonRecordStore(json_path)
+    if backend == 'sqlite':
+        return SqliteRecordStore(SQLITE_DB_PATH, table)
+    raise ValueError(f"Unknown STORAGE_BACKEND '{backend}' (expected 'json' or 'sqlite')")
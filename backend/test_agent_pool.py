@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Test script for the agent pool (no server or API key needed)
+"""
+
+from agent_pool import AgentPool
+from llm_provider import LLMSettings
+
+PERSONA = {
+    "name": "Specialist",
+    "agent": {"role": "Civic Information Specialist", "goal": "g", "backstory": "b"},
+    "task": {"description": "Explain the issue.", "expected_output": "An answer."}
+}
+
+class FakeAgent:
+    pass
+
+def test_reuse():
+    """Test that released agents are reused only for identical personas and settings"""
+    print("Testing agent reuse...")
+    pool = AgentPool()
+    settings = LLMSettings(api_key="sk-test-1")
+
+    first = pool.checkout(PERSONA, settings, FakeAgent)
+    second = pool.checkout(PERSONA, settings, FakeAgent)
+    assert first is not second, "A checked-out agent must not be handed out twice"
+    pool.release([first, second])
+    assert pool.stats() == {"idle": 2, "leased": 0}
+
+    assert pool.checkout(PERSONA, settings, FakeAgent) in (first, second)
+    assert pool.checkout(PERSONA, LLMSettings(api_key="sk-test-2"), FakeAgent) not in (first, second)
+
+    changed = dict(PERSONA, agent=dict(PERSONA["agent"], goal="another goal"))
+    assert pool.checkout(changed, settings, FakeAgent) not in (first, second)
+    print("Agent reuse OK")
+
+def test_invalidate_and_bound():
+    """Test that updating a persona drops its agents and the pool stays bounded"""
+    print("Testing invalidation and size limit...")
+    pool = AgentPool(max_idle=2)
+    settings = LLMSettings(api_key="sk-test-1")
+
+    agents = [pool.checkout(PERSONA, settings, FakeAgent) for _ in range(3)]
+    pool.release(agents)
+    assert pool.stats()["idle"] == 2
+
+    leased = pool.checkout(PERSONA, settings, FakeAgent)
+    pool.invalidate("Specialist")
+    pool.release([leased])
+    assert pool.stats() == {"idle": 0, "leased": 0}
+    assert pool.checkout(PERSONA, settings, FakeAgent) not in agents
+    print("Invalidation and size limit OK")
+
+if __name__ == "__main__":
+    print("=== Agent Pool Test ===\n")
+    test_reuse()
+    test_invalidate_and_bound()
+    print("\nAll tests completed!")
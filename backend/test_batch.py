@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script for batch execution (no server or API key needed)
+"""
+
+import threading
+import time
+
+from batch import run_batch, resolve_batch_concurrency
+
+def test_batch_results():
+    """Test that every prompt yields one result and failures do not stop the batch"""
+    print("Testing batch results...")
+
+    def run_prompt(user_prompt):
+        if user_prompt == "fail":
+            raise RuntimeError("model error")
+        return {"final": user_prompt.upper(), "steps": {}}
+
+    items = ["first", {"id": "msg-2", "user_prompt": "second"}, "fail", 42]
+    results = sorted(run_batch(items, run_prompt, max_concurrency=2), key=lambda item: item["index"])
+    for result in results:
+        print(f"  {result}")
+
+    assert [result["status"] for result in results] == ["succeeded", "succeeded", "failed", "failed"]
+    assert results[0]["id"] == 0 and results[0]["result"]["final"] == "FIRST"
+    assert results[1]["id"] == "msg-2"
+    assert results[2]["type"] == "RuntimeError"
+    assert results[3]["type"] == "ValueError"
+    print("Batch results OK")
+
+def test_bounded_and_lazy():
+    """Test that the batch reads its input lazily and honours the concurrency bound"""
+    print("Testing concurrency bound...")
+    active = []
+    peak = []
+    read = []
+    lock = threading.Lock()
+
+    def prompts():
+        for i in range(12):
+            read.append(i)
+            yield f"prompt {i}"
+
+    def run_prompt(user_prompt):
+        with lock:
+            active.append(user_prompt)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.remove(user_prompt)
+        return user_prompt
+
+    batch = run_batch(prompts(), run_prompt, max_concurrency=3)
+    next(batch)
+    assert len(read) <= 4, f"Read {len(read)} prompts ahead of a concurrency of 3"
+    rest = list(batch)
+    assert len(rest) == 11
+    print(f"Peak concurrency: {max(peak)}")
+    assert max(peak) <= 3
+
+    assert resolve_batch_concurrency(10 ** 6) <= 16
+    print("Concurrency bound OK")
+
+if __name__ == "__main__":
+    print("=== Batch Test ===\n")
+    test_batch_results()
+    test_bounded_and_lazy()
+    print("\nAll tests completed!")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test script for the bulk triage CLI's input and checkpoint handling (no API key needed)
+"""
+
+import os
+import tempfile
+
+from bulk_triage import read_prompts, load_checkpoint, open_output
+
+def test_resume():
+    """Test that succeeded messages are skipped and a partial last line is terminated"""
+    print("Testing resume from checkpoint...")
+    with tempfile.TemporaryDirectory() as directory:
+        input_path = os.path.join(directory, "messages.jsonl")
+        with open(input_path, "w") as f:
+            f.write('{"id": "a", "user_prompt": "Pothole on Main St"}\n')
+            f.write('{"id": "b", "user_prompt": "Water bill question"}\n')
+            f.write('{"user_prompt": "No id here"}\n')
+            f.write('{"id": "d"}\n')
+
+        output_path = os.path.join(directory, "results.jsonl")
+        with open(output_path, "w") as f:
+            f.write('{"id": "a", "status": "succeeded", "result": {}}\n')
+            f.write('{"id": "b", "status": "failed", "error": "timeout"}\n')
+            f.write('{"id": 3, "status": "succ')
+
+        done_ids = load_checkpoint(output_path)
+        assert done_ids == {"a"}
+
+        prompts = list(read_prompts(input_path, "jsonl", "user_prompt", "id", done_ids))
+        print(f"Remaining: {prompts}")
+        assert prompts == [
+            {"id": "b", "user_prompt": "Water bill question"},
+            {"id": 3, "user_prompt": "No id here"}
+        ]
+
+        with open_output(output_path, restart=False) as output:
+            output.write('{"id": 3, "status": "succeeded"}\n')
+        with open(output_path) as f:
+            assert f.read().endswith('"succ\n{"id": 3, "status": "succeeded"}\n')
+        assert load_checkpoint(output_path) == {"a", "3"}
+    print("Resume OK")
+
+def test_csv_input():
+    """Test reading prompts from a CSV file with custom columns"""
+    print("Testing CSV input...")
+    with tempfile.TemporaryDirectory() as directory:
+        input_path = os.path.join(directory, "messages.csv")
+        with open(input_path, "w") as f:
+            f.write('ticket,message\n')
+            f.write('T-1,"Streetlight out, corner of 5th"\n')
+            f.write('T-2,Trash pickup missed\n')
+
+        prompts = list(read_prompts(input_path, "csv", "message", "ticket", set()))
+        assert prompts == [
+            {"id": "T-1", "user_prompt": "Streetlight out, corner of 5th"},
+            {"id": "T-2", "user_prompt": "Trash pickup missed"}
+        ]
+    print("CSV input OK")
+
+if __name__ == "__main__":
+    print("=== Bulk Triage Test ===\n")
+    test_resume()
+    test_csv_input()
+    print("\nAll tests completed!")
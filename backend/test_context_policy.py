@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test script for edge context policies (no server or API key needed)
+"""
+
+from context_policy import (
+    ContextPolicy, parse_context_policy, apply_context_policy, count_tokens, extract_structure,
+    truncate_to_tokens, summary_cache_key, CONTEXT_TRUNCATE_TOKENS
+)
+
+REPORT = """# Property tax review
+
+The assessor raised the land value of the parcel after the countywide reappraisal, which happens every
+four years and which most residents only notice when the bill arrives in the mail.
+
+- Assessed value: up 18% since last year
+- Exemptions: homestead exemption applied
+- Appeal deadline: 30 days from the notice
+
+Contact: County Assessor's Office, Room 104
+""" + "Background filler sentence about the process. " * 200
+
+def test_parse():
+    """Test policy names, objects, defaults and validation"""
+    print("Testing policy parsing...")
+    assert parse_context_policy("full") == ContextPolicy()
+    assert parse_context_policy("truncate") == ContextPolicy("truncate", CONTEXT_TRUNCATE_TOKENS)
+    assert parse_context_policy({"policy": "summary", "max_tokens": 80}) == ContextPolicy("summary", 80)
+    assert parse_context_policy(None, ContextPolicy("extract", 10)) == ContextPolicy("extract", 10)
+    assert parse_context_policy(None) == ContextPolicy()
+    for spec in ["shorten", {"policy": "truncate", "max_tokens": -1}, {"policy": "extract", "max_tokens": "5"}, 3]:
+        try:
+            parse_context_policy(spec)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{spec!r} should be rejected")
+    print("Policy parsing OK")
+
+def test_reduction():
+    """Test that every policy keeps the context within its token budget"""
+    print("Testing context reduction...")
+    raw_tokens = count_tokens(REPORT)
+    summaries = []
+
+    def summarize(text, max_tokens):
+        summaries.append(max_tokens)
+        return "Tax went up 18% after the reappraisal; appeal within 30 days."
+
+    for policy in [ContextPolicy("truncate", 100), ContextPolicy("extract", 100), ContextPolicy("summary", 100)]:
+        text = apply_context_policy(REPORT, policy, summarize)
+        print(f"  {policy.mode}: {raw_tokens} -> {count_tokens(text)} tokens")
+        assert count_tokens(text) <= 120, f"{policy.mode} exceeded its budget"
+    assert summaries == [100]
+
+    extract = extract_structure(REPORT, 100)
+    assert extract.startswith("# Property tax review\n- Assessed value")
+    assert "Contact: County Assessor's Office" in extract and "filler" not in extract
+    assert extract_structure("First point. More detail.\n\nSecond point! Detail.", 50) == "First point.\nSecond point!"
+
+    assert "[truncated: 100 of" in truncate_to_tokens(REPORT, 100)
+    # Outputs within the budget are passed unchanged, without a summary call
+    assert apply_context_policy("Short answer.", ContextPolicy("summary", 100), summarize) == "Short answer."
+    assert apply_context_policy(REPORT, ContextPolicy()) is REPORT
+    assert summaries == [100]
+    print("Context reduction OK")
+
+def test_summary_cache_key():
+    """Test that summaries are keyed by text, budget and model"""
+    print("Testing summary cache keys...")
+    key = summary_cache_key(REPORT, 100)
+    assert key == summary_cache_key(REPORT, 100)
+    assert key != summary_cache_key(REPORT, 200)
+    assert key != summary_cache_key(REPORT + ".", 100)
+    print("Summary cache keys OK")
+
+if __name__ == "__main__":
+    print("=== Context Policy Test ===\n")
+    test_parse()
+    test_reduction()
+    test_summary_cache_key()
+    print("\nAll tests completed!")
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test script for compiled graph plans (no server or API key needed)
+"""
+
+from graph_plan import compile_graph, PlanCache
+
+PERSONAS = {
+    "Reframer": {
+        "name": "Reframer",
+        "agent": {"role": "Prompt Reframer", "goal": "g", "backstory": "b"},
+        "task": {"description": "The user wrote: \"{user_prompt}\"\nReframe it.", "expected_output": "A question."}
+    },
+    "Specialist": {
+        "name": "Specialist",
+        "agent": {"role": "Civic Information Specialist", "goal": "g", "backstory": "b"},
+        "task": {"description": "Explain the issue.", "expected_output": "An answer."}
+    },
+    "Editor": {
+        "name": "Editor",
+        "agent": {"role": "Final Editor", "goal": "g", "backstory": "b"},
+        "task": {"description": "Rewrite the response.", "expected_output": "The final version."}
+    }
+}
+
+GRAPH = {
+    "nodes": [
+        {"id": "reframer", "persona": "Reframer"},
+        {"id": "specialist", "persona": "Specialist"},
+        {"id": "editor", "persona": "Editor"}
+    ],
+    "edges": [
+        {"source": "reframer", "target": "specialist"},
+        {"source": "specialist", "target": "editor"},
+        {"source": "prompt", "target": "editor"}
+    ]
+}
+
+def test_compile():
+    """Test that compilation resolves personas, context and prompt slots"""
+    print("Testing graph compilation...")
+    plan = compile_graph(GRAPH, PERSONAS.get)
+    assert plan.order == ["reframer", "specialist", "editor"]
+    assert plan.entry_points == ["reframer"]
+    assert plan.nodes["editor"].context == ["specialist"]
+    assert plan.nodes["editor"].receives_prompt
+
+    description = plan.nodes["editor"].render_description("Why is my tax so high?")
+    assert description == "Original user prompt: Why is my tax so high?\n\nRewrite the response."
+    assert "Why is my tax so high?" in plan.nodes["reframer"].render_description("Why is my tax so high?")
+    print("Graph compilation OK")
+
+def test_validation():
+    """Test that blank nodes and unknown personas are reported like before"""
+    print("Testing validation...")
+    for graph, message in [
+        ({"nodes": []}, "No nodes provided"),
+        ({"nodes": [{"id": "a", "persona": ""}]}, "without personas assigned (a)"),
+        ({"nodes": [{"id": "a", "persona": "Unknown"}]}, "No valid personas found")
+    ]:
+        try:
+            compile_graph(graph, PERSONAS.get)
+        except ValueError as e:
+            assert message in str(e), str(e)
+        else:
+            raise AssertionError(f"Expected an error containing '{message}'")
+
+    # Literal braces are fine in descriptions without the prompt slot
+    personas = dict(PERSONAS, Json={
+        "name": "Json",
+        "agent": {"role": "Formatter", "goal": "g", "backstory": "b"},
+        "task": {"description": 'Reply as JSON: {"priority": "high"}', "expected_output": "JSON."}
+    })
+    plan = compile_graph({"nodes": [{"id": "k", "persona": "Reframer"}, {"id": "j", "persona": "Json"}]}, personas.get)
+    assert list(plan.nodes) == ["k", "j"], list(plan.nodes)
+    assert plan.nodes["j"].render_description("Hi") == 'Reply as JSON: {"priority": "high"}'
+
+    # Duplicate edges pass the source's output once
+    edges = GRAPH["edges"] + [{"source": "reframer", "target": "specialist"}]
+    plan = compile_graph({"nodes": GRAPH["nodes"], "edges": edges}, PERSONAS.get)
+    assert plan.nodes["specialist"].context == ["reframer"]
+    assert plan.dependencies["specialist"] == ["reframer"]
+    print("Validation OK")
+
+def test_plan_cache():
+    """Test that plans are reused until the system or a persona changes"""
+    print("Testing plan cache...")
+    personas = {name: dict(persona) for name, persona in PERSONAS.items()}
+    cache = PlanCache()
+    system = {"name": "Triage", "graph": GRAPH, "updated_at": "2025-01-01T00:00:00"}
+
+    plan = cache.get_or_compile(system, personas.get)
+    assert cache.get_or_compile(system, personas.get) is plan
+
+    assert cache.get_or_compile(dict(system, updated_at="2025-01-02T00:00:00"), personas.get) is not plan
+
+    personas["Editor"] = dict(personas["Editor"], task={"description": "Polish it.", "expected_output": "x"})
+    recompiled = cache.get_or_compile(system, personas.get)
+    assert recompiled is not plan
+    assert recompiled.nodes["editor"].render_description("") == "Polish it."
+    print("Plan cache OK")
+
+def test_context_policies():
+    """Test that edge context policies are compiled, with the graph's default"""
+    print("Testing context policies...")
+    graph = {
+        "nodes": GRAPH["nodes"],
+        "edges": [
+            {"source": "reframer", "target": "specialist"},
+            {"source": "specialist", "target": "editor", "context": {"policy": "summary", "max_tokens": 150}},
+            {"source": "prompt", "target": "editor", "context": "truncate"}
+        ],
+        "context_policy": "extract"
+    }
+    plan = compile_graph(graph, PERSONAS.get)
+    assert plan.nodes["specialist"].policy_for("reframer").mode == "extract"
+    assert plan.nodes["editor"].policy_for("specialist").max_tokens == 150
+    assert plan.nodes["editor"].needs_summary and not plan.nodes["specialist"].needs_summary
+    assert compile_graph(GRAPH, PERSONAS.get).nodes["editor"].policy_for("specialist").mode == "full"
+
+    for bad_graph in [
+        dict(graph, context_policy="shorten"),
+        dict(graph, edges=[{"source": "reframer", "target": "specialist", "context": {"policy": "truncate", "max_tokens": 0}}])
+    ]:
+        try:
+            compile_graph(bad_graph, PERSONAS.get)
+        except ValueError as e:
+            print(f"Rejected: {e}")
+        else:
+            raise AssertionError("Expected an invalid context policy to be rejected")
+    print("Context policies OK")
+
+if __name__ == "__main__":
+    print("=== Graph Plan Test ===\n")
+    test_compile()
+    test_validation()
+    test_plan_cache()
+    test_context_policies()
+    print("\nAll tests completed!")
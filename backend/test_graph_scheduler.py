@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test script for the parallel graph scheduler (no server or API key needed)
+"""
+
+import asyncio
+import threading
+import time
+
+from graph_scheduler import run_dag, run_dag_async, topological_levels
+
+def test_levels():
+    """Test grouping a fan-out graph into execution levels"""
+    print("Testing topological levels...")
+    dependencies = {
+        "reframer": [],
+        "analyst_a": ["reframer"],
+        "analyst_b": ["reframer"],
+        "editor": ["analyst_a", "analyst_b"]
+    }
+    levels = topological_levels(dependencies)
+    print(f"Levels: {levels}")
+    assert levels == [["reframer"], ["analyst_a", "analyst_b"], ["editor"]]
+
+def test_cycle_rejected():
+    """Test that cyclic graphs are rejected before running anything"""
+    print("Testing cycle detection...")
+    calls = []
+    try:
+        run_dag({"a": ["b"], "b": ["a"]}, calls.append)
+    except ValueError as e:
+        print(f"Rejected as expected: {e}")
+    else:
+        raise AssertionError("Cycle was not detected")
+    assert calls == []
+
+def test_parallel_branches():
+    """Test that independent branches run concurrently and respect dependencies"""
+    print("Testing parallel execution...")
+    dependencies = {
+        "reframer": [],
+        "analyst_a": ["reframer"],
+        "analyst_b": ["reframer"],
+        "analyst_c": ["reframer"],
+        "editor": ["analyst_a", "analyst_b", "analyst_c"]
+    }
+    finished = set()
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def run_node(node_id):
+        with lock:
+            assert all(dep in finished for dep in dependencies[node_id]), f"{node_id} started too early"
+            active.append(node_id)
+            peak.append(len(active))
+        time.sleep(0.2)
+        with lock:
+            active.remove(node_id)
+            finished.add(node_id)
+        return node_id.upper()
+
+    start = time.time()
+    results = run_dag(dependencies, run_node, max_workers=3)
+    elapsed = time.time() - start
+    print(f"Elapsed: {elapsed:.2f}s, peak concurrency: {max(peak)}")
+    assert results["editor"] == "EDITOR"
+    assert max(peak) == 3
+    # Critical path is 3 nodes deep, the sequential sum would be 5 nodes
+    assert elapsed < 0.9
+
+def test_max_parallelism():
+    """Test that the worker pool bound is honoured"""
+    print("Testing max parallelism bound...")
+    dependencies = {f"node{i}": [] for i in range(6)}
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def run_node(node_id):
+        with lock:
+            active.append(node_id)
+            peak.append(len(active))
+        time.sleep(0.05)
+        with lock:
+            active.remove(node_id)
+
+    run_dag(dependencies, run_node, max_workers=2)
+    print(f"Peak concurrency: {max(peak)}")
+    assert max(peak) <= 2
+
+def test_async_scheduler():
+    """Test the coroutine scheduler: dependencies, concurrency bound and errors"""
+    print("Testing async scheduler...")
+    dependencies = {
+        "reframer": [],
+        "analyst_a": ["reframer"],
+        "analyst_b": ["reframer"],
+        "analyst_c": ["reframer"],
+        "editor": ["analyst_a", "analyst_b", "analyst_c"]
+    }
+    finished = set()
+    active = []
+    peak = []
+
+    async def run_node(node_id):
+        assert all(dep in finished for dep in dependencies[node_id]), f"{node_id} started too early"
+        active.append(node_id)
+        peak.append(len(active))
+        await asyncio.sleep(0.1)
+        active.remove(node_id)
+        finished.add(node_id)
+        return node_id.upper()
+
+    results = asyncio.run(run_dag_async(dependencies, run_node, max_concurrency=2))
+    print(f"Peak concurrency: {max(peak)}")
+    assert results["editor"] == "EDITOR" and len(results) == 5
+    assert max(peak) == 2
+
+    async def failing_node(node_id):
+        if node_id == "analyst_a":
+            raise RuntimeError("analyst failed")
+        return node_id
+
+    try:
+        asyncio.run(run_dag_async(dependencies, failing_node))
+    except RuntimeError as e:
+        print(f"Failed as expected: {e}")
+    else:
+        raise AssertionError("Expected the node error to be raised")
+
+def test_duplicate_dependency():
+    """Test that a dependency listed twice still runs the node once"""
+    print("Testing duplicated dependencies...")
+    dependencies = {"a": [], "b": ["a", "a"]}
+    calls = []
+    lock = threading.Lock()
+
+    def run_node(node):
+        with lock:
+            calls.append(node)
+        return node
+
+    assert run_dag(dependencies, run_node) == {"a": "a", "b": "b"}
+    assert sorted(calls) == ["a", "b"], calls
+
+    calls.clear()
+
+    async def run_node_async(node):
+        return run_node(node)
+
+    assert asyncio.run(run_dag_async(dependencies, run_node_async)) == {"a": "a", "b": "b"}
+    assert sorted(calls) == ["a", "b"], calls
+    print("Duplicated dependencies OK")
+
+if __name__ == "__main__":
+    print("=== Graph Scheduler Test ===\n")
+    test_levels()
+    test_cycle_rejected()
+    test_parallel_branches()
+    test_max_parallelism()
+    test_async_scheduler()
+    test_duplicate_dependency()
+    print("\nAll tests completed!")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test script for the API key validation cache (no server or API key needed)
+"""
+
+import threading
+import time
+
+from key_validation import KeyValidationCache
+
+def test_cached_outcomes():
+    """Test that valid and rejected keys are cached, and transient errors are not"""
+    print("Testing cached outcomes...")
+    cache = KeyValidationCache(ttl=60, negative_ttl=0.1)
+    calls = []
+
+    def check(api_key):
+        calls.append(api_key)
+        if api_key == "sk-flaky":
+            raise ConnectionError("network down")
+        return api_key == "sk-good"
+
+    assert cache.validate("sk-good", check) is True
+    assert cache.validate("sk-good", check) is True
+    assert cache.validate("sk-bad", check) is False
+    assert cache.validate("sk-bad", check) is False
+    assert calls == ["sk-good", "sk-bad"]
+
+    time.sleep(0.15)
+    assert cache.validate("sk-bad", check) is False
+    assert calls == ["sk-good", "sk-bad", "sk-bad"], "Rejected keys should expire sooner"
+
+    for _ in range(2):
+        try:
+            cache.validate("sk-flaky", check)
+        except ConnectionError:
+            pass
+        else:
+            raise AssertionError("Expected the check error to be raised")
+    assert calls.count("sk-flaky") == 2, "Transient errors must not be cached"
+
+    assert not any("sk-" in str(key) for key in cache._results), "Keys must not be stored in clear"
+    print("Cached outcomes OK")
+
+def test_single_flight():
+    """Test that concurrent validations of one key share a single upstream call"""
+    print("Testing single-flight validation...")
+    cache = KeyValidationCache()
+    calls = []
+    release = threading.Event()
+
+    def check(api_key):
+        calls.append(api_key)
+        release.wait(5)
+        return True
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.validate("sk-good", check))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == [True] * 8
+    assert len(calls) == 1, f"Expected one upstream call, got {len(calls)}"
+    print("Single-flight validation OK")
+
+if __name__ == "__main__":
+    print("=== Key Validation Cache Test ===\n")
+    test_cached_outcomes()
+    test_single_flight()
+    print("\nAll tests completed!")
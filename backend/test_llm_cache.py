@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Test script for the node output cache (no server or API key needed)
+"""
+
+import tempfile
+import time
+
+from llm_cache import ResponseCache, node_cache_key
+from llm_provider import LLMSettings
+
+PERSONA = {
+    "name": "Default Civic Information Specialist",
+    "agent": {"role": "Civic Information Specialist", "goal": "Explain", "backstory": "Help desk"},
+    "task": {"description": "Explain the issue.", "expected_output": "A brief answer."}
+}
+
+def test_cache_key():
+    """Test that the key depends on inputs and model but not on the API key"""
+    print("Testing cache keys...")
+    settings = LLMSettings(api_key="sk-one")
+    key = node_cache_key(PERSONA, "Explain the issue.", "Reframed question", settings)
+    assert key == node_cache_key(PERSONA, "Explain the issue.", "Reframed question", LLMSettings(api_key="sk-two"))
+    assert key != node_cache_key(PERSONA, "Explain the issue.", "Other question", settings)
+    assert key != node_cache_key(PERSONA, "Explain the issue.", "Reframed question", LLMSettings(api_key="sk-one", model="gpt-4o"))
+    print("Cache keys OK")
+
+def test_lru_and_ttl():
+    """Test LRU eviction and TTL expiry of the in-memory cache"""
+    print("Testing LRU and TTL...")
+    cache = ResponseCache(max_entries=2, ttl=0.2, directory=None)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"  # a is now most recently used
+    cache.put("c", "C")
+    assert cache.get("b") is None and cache.get("a") == "A" and cache.get("c") == "C"
+    time.sleep(0.25)
+    assert cache.get("a") is None
+    print("LRU and TTL OK")
+
+def test_disk_backend():
+    """Test that entries survive a restart through the on-disk backend"""
+    print("Testing disk backend...")
+    directory = tempfile.mkdtemp()
+    ResponseCache(directory=directory).put("0123abcd", "Cached answer")
+    assert ResponseCache(directory=directory).get("0123abcd") == "Cached answer"
+    assert ResponseCache(directory=directory, ttl=0).get("0123abcd") is None
+    print("Disk backend OK")
+
+if __name__ == "__main__":
+    print("=== LLM Cache Test ===\n")
+    test_cache_key()
+    test_lru_and_ttl()
+    test_disk_backend()
+    print("\nAll tests completed!")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test script for per-run LLMs against a local stub of the OpenAI API
+(needs CrewAI installed, but no server or API key)
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from crewai import Agent, Task
+
+from llm_provider import LLMSettings, observe_llm_calls, flush_llm_events
+
+class StubOpenAIHandler(BaseHTTPRequestHandler):
+    """Answers chat completions with a fixed reply and usage, recording each request"""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append({
+            "path": self.path,
+            "body": body,
+            "authorization": self.headers.get('Authorization'),
+            "client": self.client_address
+        })
+        payload = json.dumps({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body.get("model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "stub answer"},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 5, "completion_tokens": 3, "total_tokens": 8}
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+def start_stub_server():
+    """Start the stub on a free local port; returns the server (stop with shutdown())"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOpenAIHandler)
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def test_openai_call():
+    """Test that a real CrewAI LLM reaches the API through the pooled client"""
+    print("Testing OpenAI call through the pooled client...")
+    server = start_stub_server()
+    try:
+        base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+        settings = LLMSettings(api_key="sk-stub", model="gpt-4o-mini", base_url=base_url, provider="openai")
+
+        answers = [settings.create_llm().call("Say hello") for _ in range(2)]
+        print(f"Answers: {answers}")
+        assert answers == ["stub answer", "stub answer"]
+
+        assert [request["path"] for request in server.requests] == ["/v1/chat/completions"] * 2
+        assert all(request["authorization"] == "Bearer sk-stub" for request in server.requests)
+        assert all("client" not in request["body"] for request in server.requests)
+        # Both runs' LLMs share the keep-alive connection of the pooled client
+        assert server.requests[0]["client"] == server.requests[1]["client"], server.requests
+    finally:
+        server.shutdown()
+    print("OpenAI call OK")
+
+def test_call_usage():
+    """Test that an agent's calls and tokens are taken from CrewAI's call events"""
+    print("Testing usage of observed calls...")
+    server = start_stub_server()
+    try:
+        base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+        settings = LLMSettings(api_key="sk-stub", model="gpt-4o-mini", base_url=base_url, provider="openai")
+        llm = settings.create_llm()
+        # Two agents sharing the run's LLM, as in a graph run
+        agents = [Agent(role=role, goal="g", backstory="b", llm=llm) for role in ("First", "Second")]
+        spans = []
+
+        for agent in agents:
+            task = Task(description="Say hello.", expected_output="A greeting.", agent=agent)
+            with observe_llm_calls(agent, lambda start, end, error: spans.append(error)) as usage:
+                output = task.execute_sync(agent=agent)
+                flush_llm_events()
+            print(f"{agent.role}: {output.raw!r}, usage {usage}")
+            assert output.raw == "stub answer"
+            # Only this agent's call, although the LLM's own totals cover both agents
+            assert usage == {"requests": 1, "prompt_tokens": 5, "completion_tokens": 3}, usage
+
+        assert len(server.requests) == 2
+        assert spans == [None, None], spans
+    finally:
+        server.shutdown()
+    print("Usage of observed calls OK")
+
+if __name__ == "__main__":
+    print("=== LLM Provider Test ===\n")
+    test_openai_call()
+    test_call_usage()
+    print("\nAll tests completed!")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Test script for the logging setup (no server or API key needed)
+"""
+
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+
+from log_setup import truncate_payload, detail_level
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def test_truncate_payload():
+    """Test that long payloads are shortened and short ones kept"""
+    print("Testing payload truncation...")
+    assert truncate_payload("short", limit=10) == "short"
+    assert truncate_payload("x" * 25, limit=10) == "x" * 10 + "... [25 chars]"
+    assert truncate_payload(12345, limit=3) == "123... [5 chars]"
+    print("Payload truncation OK")
+
+def test_detail_level():
+    """Test that verbose runs always log details and sampling can drop them"""
+    print("Testing detail sampling...")
+    assert detail_level(verbose=True, sample_rate=0.0) == logging.INFO
+    assert detail_level(sample_rate=1.0) == logging.INFO
+    assert detail_level(sample_rate=0.0) == logging.DEBUG
+    print("Detail sampling OK")
+
+def test_background_writer_rotation():
+    """Test that records reach the rotated log file through the background writer"""
+    print("Testing background writer...")
+    with tempfile.TemporaryDirectory() as directory:
+        # A separate process, so the root logger of this one is left alone
+        script = (
+            "import logging, threading\n"
+            "from log_setup import configure_logging\n"
+            "listener = configure_logging(log_file=r'%s', max_bytes=2000, backup_count=2)\n"
+            "assert configure_logging() is listener\n"
+            "for i in range(100):\n"
+            "    logging.info('record %%03d %%s', i, 'x' * 50)\n"
+            "logging.debug('not logged')\n"
+            % os.path.join(directory, "logs", "crew_run.{pid}.log")
+        )
+        subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, check=True, capture_output=True)
+
+        files = sorted(os.listdir(os.path.join(directory, "logs")))
+        assert len(files) == 3, f"Expected the log and 2 backups, got {files}"
+        assert all(name.startswith("crew_run.") and ".log" in name and "{pid}" not in name for name in files)
+        current = [name for name in files if name.endswith(".log")][0]
+        with open(os.path.join(directory, "logs", current), encoding='utf-8') as f:
+            content = f.read()
+        assert "record 099" in content, "Records queued before exit must be written"
+        assert "not logged" not in content
+    print("Background writer OK")
+
+if __name__ == "__main__":
+    print("=== Logging Setup Test ===\n")
+    test_truncate_payload()
+    test_detail_level()
+    test_background_writer_rotation()
+    print("\nAll tests completed!")
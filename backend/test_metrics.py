@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test script for the Prometheus metrics registry (no server or API key needed)
+"""
+
+import threading
+
+from metrics import MetricsRegistry
+
+def test_text_format():
+    """Test counters, gauges and histograms in the text exposition format"""
+    print("Testing text format...")
+    registry = MetricsRegistry()
+    requests = registry.counter("test_requests_total", "Requests", ["endpoint", "status"])
+    queued = registry.gauge("test_queued", "Queued runs", function=lambda: 3)
+    latency = registry.histogram("test_latency_seconds", "Latency", ["persona"], buckets=(0.5, 1, 5))
+
+    requests.inc(endpoint="/api/runs", status=202)
+    requests.inc(2, endpoint="/api/runs", status=202)
+    requests.inc(endpoint='/a"b', status=500)
+    for value in (0.2, 0.7, 3, 30):
+        latency.observe(value, persona="Final Editor")
+
+    text = registry.render()
+    print(text)
+    assert text.endswith("\n")
+    assert "# TYPE test_requests_total counter" in text
+    assert 'test_requests_total{endpoint="/api/runs",status="202"} 3' in text
+    assert 'test_requests_total{endpoint="/a\\"b",status="500"} 1' in text
+    assert "# TYPE test_queued gauge\ntest_queued 3" in text
+    assert 'test_latency_seconds_bucket{persona="Final Editor",le="0.5"} 1' in text
+    assert 'test_latency_seconds_bucket{persona="Final Editor",le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{persona="Final Editor",le="5"} 3' in text
+    assert 'test_latency_seconds_bucket{persona="Final Editor",le="+Inf"} 4' in text
+    assert 'test_latency_seconds_sum{persona="Final Editor"} 33.9' in text
+    assert 'test_latency_seconds_count{persona="Final Editor"} 4' in text
+    print("Text format OK")
+
+def test_validation():
+    """Test that label mismatches, negative increments and duplicate names are rejected"""
+    print("Testing validation...")
+    registry = MetricsRegistry()
+    errors = registry.counter("test_errors_total", "Errors", ["type"])
+    for call in (lambda: errors.inc(kind="ValueError"), lambda: errors.inc(-1, type="ValueError"),
+                 lambda: registry.counter("test_errors_total", "Errors again")):
+        try:
+            call()
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("Expected ValueError")
+    print("Validation OK")
+
+def test_concurrent_updates():
+    """Test that concurrent increments are not lost"""
+    print("Testing concurrent updates...")
+    registry = MetricsRegistry()
+    calls = registry.counter("test_calls_total", "Calls", ["model"])
+    in_flight = registry.gauge("test_in_flight", "In flight")
+
+    def work():
+        for _ in range(1000):
+            in_flight.inc()
+            calls.inc(model="mock")
+            in_flight.dec()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls.value(model="mock") == 8000
+    assert in_flight.value() == 0
+    print("Concurrent updates OK")
+
+if __name__ == "__main__":
+    print("=== Metrics Test ===\n")
+    test_text_format()
+    test_validation()
+    test_concurrent_updates()
+    print("\nAll tests completed!")
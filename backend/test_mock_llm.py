@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test script for the deterministic mock LLM responses (no server or API key needed)
+"""
+
+from mock_llm import MockResponder, parse_latency, _report_usage
+
+def test_deterministic_responses():
+    """Test that equal prompts get equal answers and latencies"""
+    print("Testing deterministic responses...")
+    responder = MockResponder(latency="uniform:0.1:0.9", tokens=50, seed=7)
+    first = responder.respond("Why is my water bill so high?")
+    again = responder.respond("Why is my water bill so high?")
+    other = responder.respond("When is brush pickup?")
+    assert first == again
+    assert first != other
+    assert 0.1 <= first[0] <= 0.9
+    assert len(first[1].split()) == 52  # "[mock <hash>]" prefix + 50 words
+
+    reseeded = MockResponder(latency="uniform:0.1:0.9", tokens=50, seed=8)
+    assert reseeded.respond("Why is my water bill so high?") != first
+
+    usage = responder.usage()
+    print(f"Usage: {usage}")
+    assert usage["calls"] == 3 and usage["completion_tokens"] == 150
+    print("Deterministic responses OK")
+
+def test_latency_specs():
+    """Test the supported latency distributions"""
+    print("Testing latency specifications...")
+    import random
+    rng = random.Random(0)
+    assert parse_latency("0.25")(rng) == 0.25
+    assert parse_latency("fixed:1.5")(rng) == 1.5
+    assert parse_latency("normal:0.1:5")(rng) >= 0
+    assert parse_latency("lognormal:0.5:0.3")(rng) > 0
+    for spec in ("slow", "uniform:1", "gamma:1:2"):
+        try:
+            parse_latency(spec)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{spec!r} should be rejected")
+    print("Latency specifications OK")
+
+def test_usage_reporting():
+    """Test that mock calls add their tokens to CrewAI's token callbacks"""
+    print("Testing usage reporting...")
+
+    class TokenProcess:
+        def __init__(self):
+            self.totals = {"prompt": 0, "completion": 0, "requests": 0}
+        def sum_prompt_tokens(self, tokens):
+            self.totals["prompt"] += tokens
+        def sum_completion_tokens(self, tokens):
+            self.totals["completion"] += tokens
+        def sum_successful_requests(self, requests):
+            self.totals["requests"] += requests
+
+    class TokenCalcHandler:
+        def __init__(self, token_cost_process):
+            self.token_cost_process = token_cost_process
+
+    token_process = TokenProcess()
+    _report_usage([object(), TokenCalcHandler(token_process)], "three word prompt", 50)
+    _report_usage(None, "ignored", 50)
+    assert token_process.totals == {"prompt": 3, "completion": 50, "requests": 1}
+    print("Usage reporting OK")
+
+if __name__ == "__main__":
+    print("=== Mock LLM Test ===\n")
+    test_deterministic_responses()
+    test_latency_specs()
+    test_usage_reporting()
+    print("\nAll tests completed!")
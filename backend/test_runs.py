@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Test script for background run management (no server or API key needed)
+"""
+
+import asyncio
+import tempfile
+import threading
+import time
+
+from runs import RunManager, QueueFullError
+
+def wait_for(manager, run_id, timeout=5):
+    """Poll a run until it has finished"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        run = manager.get(run_id)
+        if run["status"] in ("succeeded", "failed"):
+            return run
+        time.sleep(0.02)
+    raise AssertionError(f"Run {run_id} did not finish")
+
+def test_progress_and_result():
+    """Test that node progress events and the result end up in the run record"""
+    print("Testing run progress...")
+    manager = RunManager(max_workers=1)
+    release = threading.Event()
+
+    def job(listener):
+        listener({"type": "run_planned", "nodes": {"a": {"persona": "P", "role": "R"}, "b": {"persona": "P", "role": "R"}}})
+        listener({"type": "node_started", "node": "a"})
+        listener({"type": "node_completed", "node": "a", "output": "A done"})
+        listener({"type": "node_started", "node": "b"})
+        release.wait()
+        listener({"type": "node_completed", "node": "b", "output": "B done"})
+        return {"final": "B done", "steps": {}}
+
+    run = manager.submit(job)
+    assert run["status"] == "queued"
+    time.sleep(0.1)
+    running = manager.get(run["run_id"])
+    print(f"While running: {running['status']}, nodes: {running['nodes']}")
+    assert running["status"] == "running"
+    assert running["nodes"]["a"]["status"] == "completed"
+    assert running["nodes"]["b"]["status"] == "running"
+
+    release.set()
+    finished = wait_for(manager, run["run_id"])
+    assert finished["status"] == "succeeded"
+    assert finished["result"]["final"] == "B done"
+    print("Run progress OK")
+
+def test_failure():
+    """Test that a failing run is reported with its error"""
+    print("Testing failed run...")
+    manager = RunManager(max_workers=1)
+
+    def job(listener):
+        raise ValueError("No nodes provided in graph")
+
+    run = wait_for(manager, manager.submit(job)["run_id"])
+    assert run["status"] == "failed"
+    assert run["error"] == {"error": "No nodes provided in graph", "type": "ValueError"}
+    print("Failed run OK")
+
+def test_queue_limit():
+    """Test that submissions beyond the queue limit are rejected"""
+    print("Testing queue limit...")
+    manager = RunManager(max_workers=1, max_queued=2)
+    release = threading.Event()
+    job = lambda listener: release.wait()
+
+    manager.submit(job)
+    time.sleep(0.1)  # first run is now running, not queued
+    manager.submit(job)
+    manager.submit(job)
+    try:
+        manager.submit(job)
+    except QueueFullError as e:
+        print(f"Rejected as expected: {e}")
+    else:
+        raise AssertionError("Queue limit was not enforced")
+    finally:
+        release.set()
+
+def test_event_stream():
+    """Test that streaming consumers receive every event in order and can resume"""
+    print("Testing event stream...")
+    manager = RunManager(max_workers=1)
+
+    def job(listener):
+        listener({"type": "run_planned", "nodes": {"a": {"persona": "P", "role": "R"}}})
+        listener({"type": "node_started", "node": "a"})
+        for delta in ("Hel", "lo"):
+            listener({"type": "node_chunk", "node": "a", "delta": delta})
+            time.sleep(0.05)
+        listener({"type": "node_completed", "node": "a", "output": "Hello"})
+        return {"final": "Hello", "steps": {}}
+
+    run_id = manager.submit(job)["run_id"]
+    received = []
+    last_seq = -1
+    while True:
+        events, finished = manager.wait_for_events(run_id, after=last_seq, timeout=2)
+        received.extend(events)
+        if events:
+            last_seq = events[-1]["seq"]
+        if finished and not events:
+            break
+
+    types = [event["type"] for event in received]
+    print(f"Events: {types}")
+    assert types == ["run_queued", "run_started", "run_planned", "node_started",
+                     "node_chunk", "node_chunk", "node_completed", "run_succeeded"]
+    assert [event["seq"] for event in received] == list(range(len(received)))
+
+    # A reconnecting client only gets what it has not seen yet
+    events, finished = manager.wait_for_events(run_id, after=5, timeout=0)
+    assert [event["type"] for event in events] == ["node_completed", "run_succeeded"] and finished
+    print("Event stream OK")
+
+def test_synchronous_run():
+    """Test that synchronous runs are recorded with their node fingerprints"""
+    print("Testing synchronous run...")
+    manager = RunManager(max_workers=1)
+
+    def job(listener):
+        listener({"type": "run_planned", "nodes": {"a": {"persona": "P", "role": "R"}}})
+        listener({"type": "node_completed", "node": "a", "output": "A", "fingerprint": "abc"})
+        return {"final": "A", "steps": {}}
+
+    run = manager.run(job)
+    assert run["status"] == "succeeded"
+    assert manager.get(run["run_id"])["nodes"]["a"]["fingerprint"] == "abc"
+
+    try:
+        manager.run(lambda listener: 1 / 0)
+    except ZeroDivisionError:
+        pass
+    else:
+        raise AssertionError("Synchronous run should re-raise the job's error")
+    print("Synchronous run OK")
+
+def test_shared_directory():
+    """Test that another process can follow a run through RUNS_DIR"""
+    print("Testing shared run directory...")
+    with tempfile.TemporaryDirectory() as directory:
+        worker = RunManager(max_workers=1, directory=directory)
+        other = RunManager(max_workers=1, directory=directory)
+        release = threading.Event()
+
+        def job(listener):
+            listener({"type": "run_planned", "nodes": {"a": {"persona": "P", "role": "R"}}})
+            listener({"type": "node_started", "node": "a"})
+            release.wait()
+            listener({"type": "node_completed", "node": "a", "output": "A", "fingerprint": "abc"})
+            listener({"type": "run_trace", "spans": [{"name": "node", "track": "a", "start": 0.0, "end": 1.0,
+                                                      "thread": "crew-run_0", "args": {}}]})
+            return {"final": "A", "steps": {}}
+
+        run_id = worker.submit(job)["run_id"]
+        assert worker.get_trace(run_id) is None
+        time.sleep(0.1)
+        assert other.get(run_id)["nodes"]["a"]["status"] == "running"
+
+        release.set()
+        received = []
+        last_seq = -1
+        while True:
+            events, finished = other.wait_for_events(run_id, after=last_seq, timeout=2)
+            received.extend(events)
+            if events:
+                last_seq = events[-1]["seq"]
+            if finished and not events:
+                break
+        assert [event["type"] for event in received][-2:] == ["node_completed", "run_succeeded"]
+        assert other.get(run_id)["nodes"]["a"]["fingerprint"] == "abc"
+        assert "run_trace" not in [event["type"] for event in received], "Traces are not progress events"
+        assert worker.get_trace(run_id)[0]["track"] == "a"
+        assert other.get_trace(run_id) == worker.get_trace(run_id)
+        assert other.get("../" + run_id) is None and other.get("unknown") is None
+    print("Shared run directory OK")
+
+def test_shutdown():
+    """Test that shutdown waits for in-flight runs and rejects new ones"""
+    print("Testing shutdown...")
+    manager = RunManager(max_workers=1)
+
+    def job(listener):
+        time.sleep(0.2)
+        return {"final": "done", "steps": {}}
+
+    run_id = manager.submit(job)["run_id"]
+    assert manager.shutdown(timeout=5)
+    assert manager.get(run_id)["status"] == "succeeded"
+    try:
+        manager.submit(job)
+    except QueueFullError:
+        pass
+    else:
+        raise AssertionError("Expected QueueFullError after shutdown")
+    print("Shutdown OK")
+
+def test_async_executor():
+    """Test that async runs are recorded like threaded ones"""
+    print("Testing async executor...")
+    manager = RunManager(executor="async")
+
+    async def job(listener):
+        listener({"type": "run_planned", "nodes": {"a": {"persona": "P", "role": "R"}}})
+        listener({"type": "node_started", "node": "a"})
+        await asyncio.sleep(0.05)
+        listener({"type": "node_completed", "node": "a", "output": "A"})
+        return {"final": "A", "steps": {}}
+
+    run_ids = [manager.submit(job)["run_id"] for _ in range(10)]
+    for run_id in run_ids:
+        run = wait_for(manager, run_id)
+        assert run["status"] == "succeeded" and run["nodes"]["a"]["status"] == "completed"
+
+    assert manager.run(job)["result"]["final"] == "A"
+
+    async def failing_job(listener):
+        raise RuntimeError("boom")
+
+    assert wait_for(manager, manager.submit(failing_job)["run_id"])["error"]["type"] == "RuntimeError"
+    assert manager.shutdown(timeout=5)
+    print("Async executor OK")
+
+if __name__ == "__main__":
+    print("=== Background Runs Test ===\n")
+    test_progress_and_result()
+    test_failure()
+    test_queue_limit()
+    test_event_stream()
+    test_synchronous_run()
+    test_shared_directory()
+    test_shutdown()
+    test_async_executor()
+    print("\nAll tests completed!")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test script for the persona/system storage layer (no server needed)
+"""
+
+import json
+import os
+import tempfile
+
+from storage import JsonRecordStore, SqliteRecordStore, RecordExistsError
+
+def make_store(records):
+    """Create a store backed by a temporary JSON file"""
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "records.json")
+    with open(path, 'w') as f:
+        json.dump(records, f, indent=4)
+    return JsonRecordStore(path), path
+
+def test_cached_lookup():
+    """Test that lookups are served from memory until the file changes"""
+    print("Testing cached lookups...")
+    store, path = make_store([{"name": "Reframer", "agent": {"role": "A"}}])
+    assert store.get("Reframer")["agent"]["role"] == "A"
+
+    first = store.get("Reframer")
+    assert store.get("Reframer") is first, "Unchanged file should not be re-parsed"
+
+    # Edit the file behind the store's back (different size, so it is detected)
+    with open(path, 'w') as f:
+        json.dump([{"name": "Reframer", "agent": {"role": "Changed"}}], f)
+    assert store.get("Reframer")["agent"]["role"] == "Changed"
+    print("Cached lookups OK")
+
+def make_sqlite_store(records):
+    """Create a SQLite store in a temporary database"""
+    store = SqliteRecordStore(os.path.join(tempfile.mkdtemp(), "triage.db"), "records")
+    store.save_all(records)
+    return store
+
+def check_writes(store):
+    """Check insert, replace (including rename) and delete against any backend"""
+    assert store.insert({"name": "D"})
+    assert not store.insert({"name": "A"})
+
+    assert store.replace("B", {"name": "B2", "x": 1})
+    assert [r["name"] for r in store.all()] == ["A", "B2", "C", "D"]
+    try:
+        store.replace("C", {"name": "A"})
+    except RecordExistsError:
+        pass
+    else:
+        raise AssertionError("Renaming onto an existing name should fail")
+
+    assert store.delete("A")["name"] == "A"
+    assert store.delete("A") is None
+    assert not store.replace("missing", {"name": "missing"})
+    assert [r["name"] for r in store.all()] == ["B2", "C", "D"]
+    assert json.loads(store.to_json()) == store.all()
+    assert store.get("B2") == {"name": "B2", "x": 1}
+
+def test_writes():
+    """Test insert, replace (including rename) and delete"""
+    print("Testing writes...")
+    store, path = make_store([{"name": "A"}, {"name": "B"}, {"name": "C"}])
+    check_writes(store)
+
+    with open(path) as f:
+        on_disk = json.load(f)
+    assert [r["name"] for r in on_disk] == ["B2", "C", "D"]
+    print("Writes OK")
+
+def test_incremental_serialization():
+    """Test that writes produce the same file json.dump would and reuse cached fragments"""
+    print("Testing incremental serialization...")
+    systems = [
+        {"name": f"System {i}", "graph": {"nodes": [{"id": "n", "persona": "P"}], "edges": []}}
+        for i in range(50)
+    ]
+    store, path = make_store(systems)
+    store.get("System 0")
+
+    updated = dict(systems[10], description="changed")
+    store.replace("System 10", updated)
+    systems[10] = updated
+    with open(path) as f:
+        assert f.read() == json.dumps(systems, indent=4)
+
+    # Only the replaced record should be re-encoded on the next write
+    cached = dict(store._current()[1])
+    store.replace("System 20", dict(systems[20]))
+    encoded = store._current()[1]
+    assert all(encoded[name] is cached[name] for name in cached if name != "System 20")
+    assert json.loads(store.to_json()) == systems
+    print("Incremental serialization OK")
+
+def test_sqlite_backend():
+    """Test the SQLite backend with the same operations as the JSON one"""
+    print("Testing SQLite backend...")
+    store = make_sqlite_store([{"name": "A"}, {"name": "B"}, {"name": "C"}])
+    check_writes(store)
+    print("SQLite backend OK")
+
+def test_concurrent_writers():
+    """Test that concurrent writers from separate stores (as in separate processes) lose no updates"""
+    print("Testing concurrent writers...")
+    from concurrent.futures import ThreadPoolExecutor
+
+    _, path = make_store([])
+    stores = [JsonRecordStore(path) for _ in range(4)]
+
+    def add(i):
+        assert stores[i % len(stores)].insert({"name": f"Persona {i}"})
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(add, range(40)))
+
+    with open(path) as f:
+        names = {r["name"] for r in json.load(f)}
+    assert names == {f"Persona {i}" for i in range(40)}
+    assert not [f for f in os.listdir(os.path.dirname(path)) if f.endswith('.tmp')]
+    print("Concurrent writers OK")
+
+if __name__ == "__main__":
+    print("=== Storage Test ===\n")
+    test_cached_lookup()
+    test_writes()
+    test_incremental_serialization()
+    test_sqlite_backend()
+    test_concurrent_writers()
+    print("\nAll tests completed!")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test script for the run timing spans (no server or API key needed)
+"""
+
+import threading
+import time
+
+from timings import RunTimings, chrome_trace
+
+def test_summary():
+    """Test that phases exclude nested spans and nodes sum their spans"""
+    print("Testing timing summary...")
+    timings = RunTimings()
+    with timings.span("graph_validation"):
+        find_persona = timings.timed(lambda name: time.sleep(0.02) or {"name": name}, "persona_resolution")
+        assert find_persona("Final Editor") == {"name": "Final Editor"}
+        find_persona("Prompt Reframer")
+        time.sleep(0.01)
+    with timings.span("execution"):
+        start = time.perf_counter()
+        with timings.span("llm", track="editor"):
+            time.sleep(0.03)
+        timings.add("node", start, track="editor", outcome="completed")
+
+    summary = timings.summary()
+    print(f"Summary: {summary}")
+    phases = summary["phases"]
+    assert set(phases) == {"graph_validation", "persona_resolution", "execution"}
+    assert phases["persona_resolution"] >= 40
+    assert 10 <= phases["graph_validation"] < 30, "Persona resolution must not be counted twice"
+    assert phases["execution"] >= 30, "Spans of node tracks are not nested in run phases"
+    assert set(summary["nodes"]["editor"]) == {"llm_ms", "node_ms"}
+    assert summary["nodes"]["editor"]["node_ms"] >= summary["nodes"]["editor"]["llm_ms"] >= 30
+    assert summary["total_ms"] >= sum(phases.values()) - 1
+    print("Timing summary OK")
+
+def test_spans_from_threads():
+    """Test that concurrent nodes record their spans with their thread"""
+    print("Testing spans from threads...")
+    timings = RunTimings()
+
+    def node(node_id):
+        with timings.span("llm", track=node_id):
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=node, args=(f"node_{i}",), name=f"worker-{i}") for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    spans = timings.spans()
+    assert len(spans) == 8
+    assert {span.thread for span in spans} == {f"worker-{i}" for i in range(8)}
+    assert [span.start for span in spans] == sorted(span.start for span in spans)
+    assert len(timings.summary()["nodes"]) == 8
+    print("Spans from threads OK")
+
+def test_chrome_trace():
+    """Test the Chrome trace event export, grouped by node and by worker"""
+    print("Testing Chrome trace export...")
+    timings = RunTimings()
+    with timings.span("task_construction"):
+        with timings.span("prompt_build", track="editor"):
+            pass
+    start = time.perf_counter()
+    with timings.span("llm", track="editor"):
+        time.sleep(0.01)
+    timings.add("node", start, track="editor", outcome="completed")
+
+    trace = chrome_trace(timings.spans(), name="run abc")
+    events = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    names = {event["args"]["name"]: event["tid"] for event in trace["traceEvents"] if event["name"] == "thread_name"}
+    assert set(names) == {"run", "editor"}
+    assert all(event["tid"] == names[event["args"]["node"]] for event in events)
+    node = next(event for event in events if event["name"] == "node")
+    llm = next(event for event in events if event["name"] == "llm")
+    assert node["ts"] <= llm["ts"] and llm["ts"] + llm["dur"] <= node["ts"] + node["dur"] + 0.001
+    assert node["args"]["outcome"] == "completed" and llm["dur"] >= 10000
+
+    # Stored spans are plain dicts; one track per thread when grouped by worker
+    by_worker = chrome_trace([span.to_dict() for span in timings.spans()], group_by="worker")
+    assert [event["args"]["name"] for event in by_worker["traceEvents"] if event["name"] == "thread_name"] == \
+        [threading.current_thread().name]
+    try:
+        chrome_trace([], group_by="persona")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Expected ValueError for an unknown grouping")
+    print("Chrome trace export OK")
+
+if __name__ == "__main__":
+    print("=== Run Timings Test ===\n")
+    test_summary()
+    test_spans_from_threads()
+    test_chrome_trace()
+    print("\nAll tests completed!")
@@ -0,0 +1,155 @@
+"""
+Timing spans of a graph run.
+
+Every run records where its time goes as spans on tracks: the "run" track
+holds the setup phases (graph validation, persona resolution, agent and task
+construction, execution) and each node has a track of its own (queue wait,
+context assembly, LLM call, whole node). Recording a span costs two clock
+reads, so runs always record them; summary() condenses them into the
+"timings" section of a run result when the caller asks for it, and
+chrome_trace() turns them into a timeline for chrome://tracing or Perfetto.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+
+
+@dataclass
+class Span:
+    """A named interval, in seconds since the start of the run"""
+    name: str
+    track: str
+    start: float
+    end: float
+    thread: str
+    args: dict = field(default_factory=dict)
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+class RunTimings:
+    """Thread-safe collection of the spans of one run"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.started_at = time.time()
+        self._spans = []
+        self._lock = threading.Lock()
+
+    def add(self, name, start, end=None, track="run", **args):
+        """Record a span from perf_counter() values (end defaults to now)"""
+        end = time.perf_counter() if end is None else end
+        span = Span(name, track, start - self.origin, end - self.origin, threading.current_thread().name, args)
+        with self._lock:
+            self._spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name, track="run", **args):
+        """Record the duration of the block as a span"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, track=track, **args)
+
+    def timed(self, function, name, track="run"):
+        """Wrap `function` so that every call is recorded as a span"""
+        def wrapper(*args, **kwargs):
+            with self.span(name, track=track):
+                return function(*args, **kwargs)
+        return wrapper
+
+    def spans(self):
+        """Return the recorded spans in start order"""
+        with self._lock:
+            return sorted(self._spans, key=lambda span: span.start)
+
+    def summary(self):
+        """
+        Condense the spans into the "timings" section of a run result.
+
+        Phases are the run track's spans summed by name, each excluding the
+        spans nested in it (persona resolution is not counted again in graph
+        validation). Node entries sum their track's spans by name.
+
+        Returns:
+            dict with "total_ms", "phases" ({name: ms}) and "nodes"
+            ({node id: {"<span name>_ms": ms}}), in milliseconds
+        """
+        spans = self.spans()
+        phases = {}
+        # Spans enclosing the current one; each phase gets its duration minus its direct children
+        enclosing = []
+        for span in sorted((span for span in spans if span.track == "run"), key=lambda span: (span.start, -span.end)):
+            while enclosing and span.end > enclosing[-1].end:
+                enclosing.pop()
+            if enclosing:
+                parent = enclosing[-1].name
+                phases[parent] = phases.get(parent, 0.0) - span.duration
+            phases[span.name] = phases.get(span.name, 0.0) + span.duration
+            enclosing.append(span)
+
+        nodes = {}
+        for span in spans:
+            if span.track != "run":
+                node = nodes.setdefault(span.track, {})
+                node[f"{span.name}_ms"] = node.get(f"{span.name}_ms", 0.0) + span.duration
+
+        end = max((span.end for span in spans), default=0.0)
+        return {
+            "total_ms": _ms(end),
+            "phases": {name: _ms(seconds) for name, seconds in phases.items()},
+            "nodes": {node_id: {key: _ms(seconds) for key, seconds in node.items()} for node_id, node in nodes.items()}
+        }
+
+
+def chrome_trace(spans, group_by="node", name="crew run"):
+    """
+    Convert spans into the Chrome trace event format.
+
+    Args:
+        spans: Span objects or their to_dict() form
+        group_by: "node" for one track per node (plus the "run" track for
+            setup), or "worker" for one track per thread
+        name: process name shown above the tracks
+
+    Returns:
+        dict with "traceEvents", to be serialized as JSON
+    """
+    if group_by not in ("node", "worker"):
+        raise ValueError(f"Unknown trace grouping {group_by!r}, expected 'node' or 'worker'")
+    spans = [span.to_dict() if isinstance(span, Span) else span for span in spans]
+
+    tracks = {}
+    events = []
+    for span in sorted(spans, key=lambda span: (span["start"], -span["end"])):
+        key = span["track"] if group_by == "node" else span["thread"]
+        tid = tracks.setdefault(key, len(tracks) + 1)
+        events.append({
+            "name": span["name"],
+            "cat": "run" if span["track"] == "run" else "node",
+            "ph": "X",
+            "ts": round(span["start"] * 1e6, 3),
+            "dur": round((span["end"] - span["start"]) * 1e6, 3),
+            "pid": 1,
+            "tid": tid,
+            "args": dict(span["args"], node=span["track"], thread=span["thread"])
+        })
+
+    metadata = [{"name": "process_name", "ph": "M", "pid": 1, "tid": 0, "args": {"name": name}}]
+    for key, tid in tracks.items():
+        metadata.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": key}})
+        metadata.append({"name": "thread_sort_index", "ph": "M", "pid": 1, "tid": tid, "args": {"sort_index": tid}})
+    return {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
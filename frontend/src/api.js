@@ -10,6 +10,9 @@ const api = axios.create({
   },
 });
 
+// How often to poll the status of a background run
+const RUN_POLL_INTERVAL_MS = 1500;
+
 // Helper function to get user API key from encrypted storage
 const getUserApiKey = async () => {
   try {
@@ -81,8 +84,21 @@ export const apiService = {
       user_prompt: userPrompt,
       user_api_key: userApiKey
     };
-    const response = await api.post('/api/run-crew-graph', payload);
-    return response.data;
+
+    // Submit the run in the background and poll for its result, so long
+    // graphs are not cut off by proxy read timeouts
+    const submitted = await api.post('/api/runs', payload);
+    const runId = submitted.data.run_id;
+    for (;;) {
+      await new Promise((resolve) => setTimeout(resolve, RUN_POLL_INTERVAL_MS));
+      const { data: run } = await api.get(`/api/runs/${runId}`);
+      if (run.status === 'succeeded') {
+        return run.result;
+      }
+      if (run.status === 'failed') {
+        throw new Error(run.error?.error || 'Failed to run crew workflow');
+      }
+    }
   },
 
   // Systems
@@ -51,11 +51,21 @@ echo "Files in backend directory:"
 ls -la backend/
 echo "=== End Debug ==="
 
-# Start the Flask backend in the background
+# Start the Flask backend in the background (gunicorn, see gunicorn.conf.py)
 echo "Starting Flask backend on port 5000..."
-python app.py &
+gunicorn -c gunicorn.conf.py wsgi:app &
 BACKEND_PID=$!
 
+# Forward stop signals so in-flight runs can finish before the container exits
+shutdown() {
+    echo "Stopping Flask backend..."
+    kill -TERM $BACKEND_PID 2>/dev/null
+    wait $BACKEND_PID
+    nginx -s quit
+    exit 0
+}
+trap shutdown TERM INT
+
 # Wait for backend to be ready
 if check_service "Flask backend" 5000; then
     echo "All services started successfully!"